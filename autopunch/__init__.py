@@ -0,0 +1 @@
+"""自動打卡系統核心模組（不依賴 Streamlit）"""
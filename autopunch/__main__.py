@@ -0,0 +1,7 @@
+# python -m autopunch 的入口
+import sys  # 結束代碼
+
+from autopunch.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
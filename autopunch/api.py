@@ -0,0 +1,267 @@
+# Netlify functions API：案件清單、案件編輯頁面與打卡提交（不依賴 Streamlit）
+import codecs  # 檢查編碼名稱
+import json  # JSON 處理
+import os  # 讀取環境變數
+from datetime import datetime, timezone, timedelta  # 日期時間處理（加入時區支援）
+
+from autopunch.fields import CASE_EDIT_EXTRACTOR  # 案件編輯頁面欄位規格
+from autopunch.timing import span, STAGE_ENCODE, STAGE_EXTRACT  # 階段計時
+
+# API 基礎網址（可用環境變數指向測試伺服器）
+BASE_URL = os.environ.get("AUTOPUNCH_BASE_URL", "https://herbworklog.netlify.app/.netlify/functions")
+
+# 提交打卡的請求標頭
+SUBMIT_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+# 設定台灣時區
+TAIWAN_TZ = timezone(timedelta(hours=8))  # UTC+8
+
+
+def get_taiwan_time():
+    """取得台灣當前時間"""
+    return datetime.now(TAIWAN_TZ)
+
+
+def get_taiwan_date_string():
+    """取得台灣當前日期字串 (YYYY-MM-DD)"""
+    return get_taiwan_time().strftime("%Y-%m-%d")
+
+
+def get_taiwan_datetime_string():
+    """取得台灣當前日期時間字串 (YYYY-MM-DD HH:MM:SS)"""
+    return get_taiwan_time().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def split_case_list(case_list):
+    """把逗號分隔的案件清單拆成案件編號列表"""
+    return [k.strip() for k in case_list.split(",") if k.strip()]
+
+
+def cached_request(client, *parts):
+    """
+    查詢用戶端的持久化回應快取，回傳 (快取鍵, 快取項目, 條件式請求標頭)
+
+    用戶端沒有回應快取時全部為 None；parts 為辨識請求的欄位（不可含密碼）。
+    """
+    responses = client.response_cache
+    if responses is None:
+        return None, None, None
+    key = responses.key(client.base_url, *parts)
+    entry = responses.lookup(key)
+    return key, entry, (entry.conditional_headers() if entry else None)
+
+
+def conditional_rejected(entry, resp):
+    """條件式請求沒有得到 2xx 或 304（例如 412 Precondition Failed）"""
+    return entry is not None and resp.status_code != 304 and not 200 <= resp.status_code < 300
+
+
+def post_cached(client, path, parts, **kwargs):
+    """
+    送出條件式 POST，回傳 (快取鍵, 快取項目, 回應)；快取項目不為 None 且回應為 304 時沿用快取
+
+    依 RFC 9110，POST 的 If-None-Match 不符時後端可回 412，If-Modified-Since 則會被忽略；
+    本功能仰賴後端對 POST 回 304。條件式請求得到 412 或其他非 2xx / 304 回應時，
+    移除快取項目並改送一次不帶條件的請求，避免同一個鍵在 TTL 內一直失敗。
+    """
+    key, entry, headers = cached_request(client, path, *parts)
+    resp = client.post(path, headers=headers, **kwargs)
+    if conditional_rejected(entry, resp):
+        resp.close()
+        client.response_cache.invalidate(key)
+        entry = None
+        resp = client.post(path, **kwargs)
+    return key, entry, resp
+
+
+# 以下為不需連線的請求內容與結果處理，同步版本與 async_api 共用，兩者只差在 HTTP 呼叫
+
+def login_form(user_id, password):
+    """登入（取得案件清單）的表單內容"""
+    return {
+        "user_id": user_id,
+        "f_password": password,
+        "f_password2": "",
+        "from_case_edit": ""
+    }
+
+
+def response_encoding(headers):
+    """
+    回應內容的編碼（規則與 requests 的 resp.encoding 相同），同步與非同步版本都以此解碼
+
+    Content-Type 有 charset 時使用 charset；text/* 沒有 charset 時為 ISO-8859-1；
+    其餘情況或無法辨識的編碼名稱一律為 utf-8。
+    """
+    from requests.utils import get_encoding_from_headers  # 與原本的 resp.text 相同的判斷
+
+    encoding = get_encoding_from_headers(headers) or "utf-8"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return "utf-8"
+    return encoding
+
+
+def response_text(resp):
+    """以 response_encoding() 解碼已讀完的回應內容（requests 與 httpx 的回應都適用）"""
+    return resp.content.decode(response_encoding(resp.headers), errors="replace")
+
+
+def case_list_from_html(html):
+    """從案件清單頁面取得逗號分隔的案件清單，沒有案件時回傳 None"""
+    from autopunch.parsing import parse_case_list  # 延後載入 HTML 解析套件，縮短冷啟動時間
+
+    # 只解析案件清單表格，提取每行第2個td的內容（案件編號），用逗號串接
+    case_numbers = parse_case_list(html)
+    return ",".join(case_numbers) if case_numbers else None
+
+
+def not_modified(entry, resp):
+    """條件式請求得到 304：沿用快取項目"""
+    return entry is not None and resp.status_code == 304
+
+
+def store_response(client, key, headers, value):
+    """新下載的解析結果存入回應快取（有使用且有結果時），回傳 value"""
+    if key is not None and value:
+        client.response_cache.store(key, headers, value)
+    return value
+
+
+def case_edit_form(case_key, case_list, user_id):
+    """案件編輯頁面的表單內容"""
+    return {
+        "form_key": case_key,
+        "table_case_id_list": case_list,
+        "user_id": user_id
+    }
+
+
+def cached_fields(cache, case_key, user_id, fresh=False):
+    """
+    查詢案件快取，回傳 (欄位值或 None, 快取版本)
+
+    未命中時回傳請求前的版本，若下載期間有提交寫入較新的資料，remember_fetched_fields() 就不用舊回應覆蓋。
+    """
+    if cache is None:
+        return None, None
+    cache_key = (user_id, case_key)
+    if not fresh:
+        fields = cache.get(cache_key)
+        if fields is not None:
+            return fields, None
+    return None, cache.version(cache_key)
+
+
+def remember_fetched_fields(cache, case_key, user_id, fields, version):
+    """下載的欄位值寫入案件快取，回傳 fields"""
+    if cache is not None:
+        cache.put((user_id, case_key), fields, expected_version=version)
+    return fields
+
+
+def punch_form(payload):
+    """提交打卡的表單內容：payload 轉成 JSON 字串，放在 fields 欄位中"""
+    with span(STAGE_ENCODE):
+        return {"fields": json.dumps(payload)}
+
+
+def fetch_case_list(client, user_id, password, deadline=None):
+    """
+    根據使用者帳密自動取得案件清單
+
+    有回應快取時送出條件式請求，後端回 304 時沿用上次解析的案件清單。
+    有 deadline 時時限已到就不送出（回傳 None），逾時以剩餘時間截斷。
+    """
+    try:
+        key, entry, resp = post_cached(
+            client, "case_list", (user_id,), data=login_form(user_id, password), deadline=deadline
+        )
+        if not_modified(entry, resp):
+            return client.response_cache.revalidated(key, entry)
+        resp.raise_for_status()
+        return store_response(client, key, resp.headers, case_list_from_html(response_text(resp)))
+    except Exception as e:
+        return None
+
+
+def fetch_case_edit(client, case_key, case_list, user_id, cache=None, limiter=None, fresh=False,
+                     deadline=None):
+    """
+    取得案件編輯頁面的欄位值 dict（有快取時先查快取，fresh=True 時略過快取直接下載）
+
+    頁面以串流方式讀取，所有欄位都讀到就停止下載；超過大小上限時拋出 ResponseTooLarge。
+    有回應快取時送出條件式請求，後端回 304 時沿用上次解析的欄位值。
+    """
+    fields, version = cached_fields(cache, case_key, user_id, fresh)
+    if fields is not None:
+        return fields
+
+    from autopunch.streaming import ResponseTooLarge, read_case_edit_fields  # 延後載入 HTML 解析套件
+
+    try:
+        key, entry, resp = post_cached(
+            client, "case_edit", (user_id, case_key), data=case_edit_form(case_key, case_list, user_id),
+            limiter=limiter, deadline=deadline, stream=True
+        )
+        if not_modified(entry, resp):
+            resp.close()
+            fields = client.response_cache.revalidated(key, entry)
+        else:
+            fields = store_response(client, key, resp.headers, read_case_edit_fields(resp))
+        return remember_fetched_fields(cache, case_key, user_id, fields, version)
+    except ResponseTooLarge:
+        raise
+    except Exception as e:
+        return None
+
+
+def extract_fields(fields, today, user_id, punch_message):
+    """從案件欄位值建立打卡 payload"""
+    with span(STAGE_EXTRACT):
+        # 複製一份，避免修改到快取中的欄位值
+        payload = dict(fields)
+
+        # 轉換 f_key 為整數
+        payload["f_key"] = int(payload["f_key"])
+
+        # 更新工作日誌
+        original_log = payload.get("f_log", "")
+        payload["f_log"] = f"{punch_message}\n\n{original_log}".strip()
+
+        # 設定更新資訊
+        payload["f_update_date"] = today
+        payload["f_last_editor"] = user_id
+
+    return payload
+
+
+def remember_submitted_fields(cache, case_key, user_id, payload, succeeded):
+    """提交後更新案件快取：成功時寫入提交後的欄位值，失敗時讓快取失效"""
+    cache_key = (user_id, case_key)
+    if not succeeded:
+        # 伺服器狀態不確定，下次重新下載
+        cache.invalidate(cache_key)
+        return
+
+    fields = {fid: payload[fid] for fid in CASE_EDIT_EXTRACTOR.field_ids}
+    fields["f_key"] = str(payload["f_key"])  # 還原為頁面上的字串格式
+    cache.put(cache_key, fields)
+
+
+def submit_punch(client, payload, limiter=None, deadline=None):
+    """提交打卡資料"""
+    try:
+        resp = client.post(
+            "sql_for_case",
+            headers=SUBMIT_HEADERS,
+            data=punch_form(payload),
+            limiter=limiter,
+            deadline=deadline,
+            idempotent=False  # 寫入請求：伺服器可能已處理時不重試，避免重複打卡
+        )
+        resp.raise_for_status()
+        return response_text(resp)
+    except Exception as e:
+        return None
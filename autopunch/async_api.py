@@ -0,0 +1,373 @@
+# 非同步 API 客戶端（httpx）：一個事件迴圈同時處理大量案件，結果與同步版本完全相同
+#
+# httpx 為選用套件；未安裝時 async_available() 回傳 False，其餘功能不受影響。
+import asyncio  # 事件迴圈
+import importlib.util  # 檢查選用套件
+import queue  # 把結果交回呼叫端執行緒
+import threading  # 背景事件迴圈執行緒
+import time  # 計時
+
+from autopunch.api import (  # 與同步版本共用的請求內容與結果處理
+    BASE_URL, SUBMIT_HEADERS, cached_fields, cached_request, case_edit_form, case_list_from_html,
+    conditional_rejected, login_form, not_modified, punch_form, remember_fetched_fields, response_text, store_response
+)
+from autopunch.batch import DEFAULT_MAX_WORKERS  # 預設同時處理數
+from autopunch.ratelimit import parse_retry_after  # Retry-After 解析
+from autopunch.resilience import ERROR_CONNECT, ERROR_READ  # 錯誤階段分類
+from autopunch.timing import span, STAGE_NETWORK, STAGE_THROTTLE  # 階段計時
+from autopunch.deadline import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, split_timeout  # 連線 / 讀取逾時
+from autopunch.http_client import no_cookie_policy  # 共用連線不保存 cookie
+from autopunch.runner import PunchBatch, create_system_error_result  # 批次流程（判斷邏輯與同步版本共用）
+
+DEFAULT_MAX_CONNECTIONS = 20  # 同一個事件迴圈最多同時開啟的連線數
+DEFAULT_TIMEOUT = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)  # (連線逾時, 讀取逾時) 秒數
+
+
+def async_available():
+    """是否已安裝 httpx"""
+    return importlib.util.find_spec("httpx") is not None
+
+
+class AsyncPunchClient:
+    """httpx.AsyncClient 的包裝，介面與 PunchClient 相同但為 async"""
+
+    def __init__(self, base_url=BASE_URL, max_connections=DEFAULT_MAX_CONNECTIONS, timeout=DEFAULT_TIMEOUT,
+                 retry_policy=None, breaker=None, response_cache=None):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.response_cache = response_cache
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx_timeout(timeout)
+        )
+        self.client.cookies.jar.set_policy(no_cookie_policy())
+        self._request_count = 0
+        self._total_elapsed = 0.0
+        self._retry_count = 0
+
+    async def post(self, path, data=None, headers=None, timeout=None, limiter=None, idempotent=True, deadline=None,
+                   stream=False, cookies=None):
+        """
+        對 BASE_URL 底下的路徑發送 POST 請求，重試與斷路器規則與 PunchClient.post 相同
+
+        stream=True 時只讀到回應標頭，內容由呼叫端以 aiter_bytes() 讀取並負責 aclose()。
+        """
+        import httpx
+
+        attempt = 0
+        while True:
+            if deadline:
+                # 先確認時限，時限已到就不佔用斷路器的試探名額
+                deadline.check()
+            probe = self.breaker.before_request() if self.breaker else None
+            try:
+                resp = await self._send(path, data, headers, timeout, limiter, deadline, stream, idempotent, cookies)
+            except httpx.HTTPError as e:
+                if self.breaker:
+                    self.breaker.record_failure()
+                policy = self.retry_policy
+                if not policy or not policy.should_retry_error(httpx_error_kind(e), attempt, idempotent):
+                    raise
+                delay = policy.delay(attempt)
+                if deadline and deadline.remaining() <= delay:
+                    raise
+            except BaseException:
+                # 與後端無關的結束（批次時限、工作被取消）：歸還試探名額，不計入成功或失敗
+                if self.breaker:
+                    self.breaker.release_probe(probe)
+                raise
+            else:
+                if self.breaker:
+                    if resp.status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                policy = self.retry_policy
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if not policy or not policy.should_retry_status(resp.status_code, attempt, idempotent, retry_after):
+                    return resp
+                delay = policy.delay(attempt, retry_after)
+                if deadline and deadline.remaining() <= delay:
+                    return resp
+                await resp.aclose()
+            self._retry_count += 1
+            with span(STAGE_THROTTLE):
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, path, data, headers, timeout, limiter, deadline, stream=False, idempotent=True,
+                    cookies=None):
+        """送出單次請求並回報給速率限制器；寫入請求（idempotent=False）的讀取逾時不以時限截斷"""
+        import httpx
+
+        if limiter:
+            with span(STAGE_THROTTLE):
+                await limiter.acquire_async()
+        timeout = timeout or self.timeout
+        if deadline:
+            timeout = deadline.timeout(*split_timeout(timeout), clip_read=idempotent)
+        started = time.monotonic()
+        try:
+            with span(STAGE_NETWORK):
+                request = self.client.build_request(
+                    "POST",
+                    f"{self.base_url}/{path.lstrip('/')}",
+                    data=data,
+                    headers=headers,
+                    cookies=cookies,
+                    timeout=httpx_timeout(timeout)
+                )
+                resp = await self.client.send(request, stream=stream)
+        except httpx.HTTPError:
+            if limiter:
+                limiter.record(None, time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        self._request_count += 1
+        self._total_elapsed += elapsed
+        if limiter:
+            limiter.record(resp.status_code, elapsed, retry_after=parse_retry_after(resp.headers.get("Retry-After")))
+        return resp
+
+    def stats(self):
+        """回傳請求數與平均延遲"""
+        count = self._request_count
+        return {
+            "requests": count,
+            "avg_latency": self._total_elapsed / count if count else 0.0,
+            "retries": self._retry_count,
+            "circuit": self.breaker.state if self.breaker else None,
+        }
+
+    async def aclose(self):
+        """關閉所有連線"""
+        await self.client.aclose()
+
+
+def httpx_timeout(timeout):
+    """把 (連線逾時, 讀取逾時) 轉成 httpx.Timeout"""
+    import httpx
+
+    connect, read = split_timeout(timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+def httpx_error_kind(exc):
+    """判斷 httpx 例外發生在連線建立階段或讀取回應階段"""
+    import httpx
+
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return ERROR_CONNECT
+    return ERROR_READ
+
+
+async def post_cached(client, path, parts, **kwargs):
+    """送出條件式 POST，回傳 (快取鍵, 快取項目, 回應)；規則與 api.post_cached 相同（非同步版本）"""
+    key, entry, headers = cached_request(client, path, *parts)
+    resp = await client.post(path, headers=headers, **kwargs)
+    if conditional_rejected(entry, resp):
+        await resp.aclose()
+        client.response_cache.invalidate(key)
+        entry = None
+        resp = await client.post(path, **kwargs)
+    return key, entry, resp
+
+
+async def fetch_case_list(client, user_id, password, deadline=None):
+    """根據使用者帳密自動取得案件清單（非同步版本）"""
+    try:
+        key, entry, resp = await post_cached(
+            client, "case_list", (user_id,), data=login_form(user_id, password), deadline=deadline
+        )
+        if not_modified(entry, resp):
+            return client.response_cache.revalidated(key, entry)
+        resp.raise_for_status()
+        return store_response(client, key, resp.headers, case_list_from_html(response_text(resp)))
+    except Exception as e:
+        return None
+
+
+async def fetch_case_edit(client, case_key, case_list, user_id, cache=None, limiter=None, fresh=False,
+                           deadline=None):
+    """取得案件編輯頁面的欄位值 dict（非同步版本）"""
+    fields, version = cached_fields(cache, case_key, user_id, fresh)
+    if fields is not None:
+        return fields
+
+    from autopunch.streaming import ResponseTooLarge, read_case_edit_fields_async  # 延後載入 HTML 解析套件
+
+    try:
+        key, entry, resp = await post_cached(
+            client, "case_edit", (user_id, case_key), data=case_edit_form(case_key, case_list, user_id),
+            limiter=limiter, deadline=deadline, stream=True
+        )
+        if not_modified(entry, resp):
+            await resp.aclose()
+            fields = client.response_cache.revalidated(key, entry)
+        else:
+            fields = store_response(client, key, resp.headers, await read_case_edit_fields_async(resp))
+        return remember_fetched_fields(cache, case_key, user_id, fields, version)
+    except ResponseTooLarge:
+        raise
+    except Exception as e:
+        return None
+
+
+async def submit_punch(client, payload, limiter=None, deadline=None):
+    """提交打卡資料（非同步版本）"""
+    try:
+        resp = await client.post(
+            "sql_for_case",
+            headers=SUBMIT_HEADERS,
+            data=punch_form(payload),
+            limiter=limiter,
+            deadline=deadline,
+            idempotent=False
+        )
+        resp.raise_for_status()
+        return response_text(resp)
+    except Exception as e:
+        return None
+
+
+class AsyncPunchBatch(PunchBatch):
+    """PunchBatch 的非同步版本：client 需為 AsyncPunchClient，以 *_async 方法執行"""
+
+    async def fetch_async(self, key, fresh=False):
+        """下載案件欄位值，回傳 (fields, 失敗結果)"""
+        try:
+            return self.after_fetch(key, await fetch_case_edit(
+                self.client, key, self.case_list, self.user_id,
+                cache=self.cache, limiter=self.limiter, fresh=fresh, deadline=self.deadline
+            ))
+        except Exception as e:
+            return None, create_system_error_result(key, e)
+
+    async def prepare_async(self, index):
+        """下載階段：已打卡的案件直接略過（或先核對），其餘下載案件資料"""
+        with self.traced(index):
+            key, result, verify = self.before_fetch(index)
+            if result is not None:
+                return result
+            prepared = await self.fetch_async(key, fresh=verify)
+            return self.after_verify(key, prepared) if verify else prepared
+
+    async def complete_async(self, index, prepared):
+        """提交階段：提取欄位 → 提交打卡，回傳案件結果"""
+        with self.traced(index):
+            key = self.case_keys[index]
+            payload, result = self.before_submit(key, prepared)
+            if result is not None:
+                return result
+            try:
+                response = await submit_punch(self.client, payload, limiter=self.limiter, deadline=self.deadline)
+                return self.after_submit(key, payload, response)
+            except Exception as e:
+                return create_system_error_result(key, e)
+
+    async def process_async(self, index):
+        """處理單一案件：下載 → 提取欄位 → 提交打卡"""
+        return await self.complete_async(index, await self.prepare_async(index))
+
+    async def iter_results(self, indices=None, concurrency=DEFAULT_MAX_WORKERS):
+        """以最多 concurrency 個同時進行的案件處理，依完成順序產生 (index, result)"""
+        indices = list(range(len(self.case_keys))) if indices is None else list(indices)
+        semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+        async def guarded(index):
+            async with semaphore:
+                return index, await self.process_async(index)
+
+        tasks = [asyncio.ensure_future(guarded(index)) for index in indices]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run_async(self, indices=None, concurrency=DEFAULT_MAX_WORKERS, on_result=None):
+        """執行批次，回傳與 indices 相同順序的結果列表"""
+        indices = list(range(len(self.case_keys))) if indices is None else list(indices)
+        position = {index: i for i, index in enumerate(indices)}
+        results = [None] * len(indices)
+        done_count = 0
+        async for index, result in self.iter_results(indices, concurrency):
+            results[position[index]] = result
+            done_count += 1
+            if on_result:
+                on_result(index, result, done_count)
+        return results
+
+
+class AsyncBridge:
+    """
+    同步程式呼叫非同步 API 的橋接：在背景執行緒維持一個常駐事件迴圈
+
+    事件迴圈常駐，AsyncPunchClient 的連線可以跨批次重用；結果透過佇列交回
+    呼叫端執行緒，因此 on_result 可以安全地更新 Streamlit 元件。
+    """
+
+    def __init__(self, base_url=BASE_URL, max_connections=DEFAULT_MAX_CONNECTIONS, retry_policy=None, breaker=None,
+                 response_cache=None):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="punch-async", daemon=True)
+        self._thread.start()
+        self.client = self.call(
+            self._make_client(base_url, max_connections, retry_policy, breaker, response_cache)
+        )
+
+    @staticmethod
+    async def _make_client(base_url, max_connections, retry_policy, breaker, response_cache):
+        return AsyncPunchClient(
+            base_url, max_connections=max_connections, retry_policy=retry_policy, breaker=breaker,
+            response_cache=response_cache
+        )
+
+    def call(self, coro):
+        """在背景事件迴圈執行 coroutine 並等待結果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen):
+        """在背景事件迴圈執行非同步產生器，並在呼叫端執行緒逐一取得結果"""
+        items = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except BaseException as e:
+                items.put((finished, e))
+            else:
+                items.put((finished, None))
+
+        asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        while True:
+            item, error = items.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                return
+            yield item
+
+    def run_batch(self, batch, indices=None, concurrency=DEFAULT_MAX_WORKERS, on_result=None):
+        """以同步方式執行 AsyncPunchBatch，on_result 在呼叫端執行緒呼叫"""
+        indices = list(range(len(batch.case_keys))) if indices is None else list(indices)
+        position = {index: i for i, index in enumerate(indices)}
+        results = [None] * len(indices)
+        stream = self.iterate(batch.iter_results(indices, concurrency))
+        for done_count, (index, result) in enumerate(stream, 1):
+            results[position[index]] = result
+            if on_result:
+                on_result(index, result, done_count)
+        return results
+
+    def close(self):
+        """關閉連線並停止事件迴圈"""
+        self.call(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,164 @@
+# 登入狀態快取：以加鹽雜湊後的員工編號為鍵，保存後端回傳的案件清單
+#
+# 快取中不保存密碼明文，只保存加鹽的 PBKDF2 驗證值；同一位員工以相同密碼再次登入時
+# 直接重用登入狀態，不必再送一次帳密、下載並解析案件清單。密碼不同時視為未命中，重新登入。
+# 超過 ttl 但未超過 stale_ttl 的登入狀態可以先拿來用，同時在背景重新登入（stale-while-revalidate）。
+import hashlib  # 密碼驗證值
+import hmac  # 員工編號雜湊、常數時間比對
+import secrets  # 隨機鹽
+import threading  # 統計資料的執行緒鎖
+import time  # 登入時間
+from concurrent.futures import ThreadPoolExecutor  # 背景重新登入
+
+from autopunch.api import fetch_case_list, split_case_list  # 登入並取得案件清單
+from autopunch.cache import TTLCache  # LRU + TTL 快取
+
+DEFAULT_SESSION_TTL = 300  # 登入狀態視為最新的秒數
+DEFAULT_STALE_TTL = 24 * 60 * 60  # 過期後仍可先顯示、再於背景更新的秒數
+DEFAULT_REFRESH_WORKERS = 2  # 同時進行的背景重新登入數
+DEFAULT_MAX_SESSIONS = 1000  # 最多保留幾位員工的登入狀態
+VERIFIER_ITERATIONS = 100_000  # PBKDF2 迭代次數
+
+
+def password_verifier(password, salt):
+    """以 PBKDF2-HMAC-SHA256 計算密碼驗證值"""
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, VERIFIER_ITERATIONS)
+
+
+def diff_case_lists(old, new):
+    """比較兩份逗號分隔的案件清單，回傳 (新增的案件, 移除的案件)，各自保持原本順序"""
+    old_keys = split_case_list(old or "")
+    new_keys = split_case_list(new or "")
+    old_set, new_set = set(old_keys), set(new_keys)
+    return [k for k in new_keys if k not in old_set], [k for k in old_keys if k not in new_set]
+
+
+class AuthSession:
+    """一位員工的登入狀態：案件清單與密碼驗證值（後端以表單中的員工編號識別，不需要 cookie）"""
+
+    __slots__ = ("case_list", "logged_in_at", "_salt", "_verifier")
+
+    def __init__(self, password, case_list):
+        self.case_list = case_list
+        self.logged_in_at = time.time()
+        self._salt = secrets.token_bytes(16)
+        self._verifier = password_verifier(password, self._salt)
+
+    def verify(self, password):
+        """密碼是否與登入時相同"""
+        return hmac.compare_digest(password_verifier(password, self._salt), self._verifier)
+
+    @property
+    def age(self):
+        """登入至今的秒數"""
+        return time.time() - self.logged_in_at
+
+
+class SessionCache:
+    """
+    執行緒安全的登入狀態快取，所有 session 與分頁共用
+
+    快取鍵為 HMAC(程序鹽, 員工編號)；程序鹽每次啟動時隨機產生，不會寫到磁碟。
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL, maxsize=DEFAULT_MAX_SESSIONS, stale_ttl=DEFAULT_STALE_TTL):
+        self.ttl = ttl
+        # 快取本身保留到 stale_ttl，是否仍為最新由登入時間判斷
+        self._sessions = TTLCache(maxsize=maxsize, ttl=max(ttl, stale_ttl))
+        self._key_salt = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=DEFAULT_REFRESH_WORKERS, thread_name_prefix="session-refresh")
+        self._refreshing = {}  # {快取鍵: Future}，同一位員工同時只有一個背景重新登入
+        self._reused = 0
+        self._logins = 0
+        self._refreshes = 0
+
+    def user_key(self, user_id):
+        """員工編號的加鹽雜湊"""
+        return hmac.new(self._key_salt, str(user_id).encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def get(self, user_id, password, allow_stale=False):
+        """取得密碼相符且仍為最新（allow_stale=True 時含過期但可先使用）的登入狀態，沒有時回傳 None"""
+        session = self._sessions.get(self.user_key(user_id))
+        if session is None or (not allow_stale and session.age > self.ttl) or not session.verify(password):
+            return None
+        return session
+
+    def put(self, user_id, password, case_list):
+        """保存登入狀態，回傳建立的 AuthSession"""
+        session = AuthSession(password, case_list)
+        self._sessions.put(self.user_key(user_id), session)
+        return session
+
+    def invalidate(self, user_id):
+        """移除某位員工的登入狀態"""
+        self._sessions.pop(self.user_key(user_id))
+
+    def login(self, client, user_id, password, fresh=False):
+        """
+        取得登入狀態，回傳 (AuthSession 或 None, 是否重用快取)
+
+        快取中有相符的登入狀態時直接回傳；否則向後端登入，成功才寫入快取。
+        fresh=True 時略過快取，強制重新登入。
+        """
+        if not fresh:
+            session = self.get(user_id, password)
+            if session is not None:
+                with self._lock:
+                    self._reused += 1
+                return session, True
+
+        case_list = fetch_case_list(client, user_id, password)
+        with self._lock:
+            self._logins += 1
+        if not case_list:
+            return None, False
+        return self.put(user_id, password, case_list), False
+
+    def login_stale_while_revalidate(self, client, user_id, password):
+        """
+        取得登入狀態，回傳 (AuthSession 或 None, 是否重用快取, 背景更新的 Future 或 None)
+
+        登入狀態已過期但仍在 stale_ttl 內時，立即回傳舊的狀態，並在背景重新登入；
+        Future 的結果為 {"case_list": 新清單或 None, "added": [...], "removed": [...]}。
+        """
+        session = self.get(user_id, password, allow_stale=True)
+        if session is None:
+            return self.login(client, user_id, password, fresh=True) + (None,)
+        with self._lock:
+            self._reused += 1
+        if session.age <= self.ttl:
+            return session, True, None
+        return session, True, self.revalidate(client, user_id, password, session)
+
+    def revalidate(self, client, user_id, password, previous):
+        """在背景重新登入，並與先前的案件清單比較；同一位員工已在更新中時共用同一個 Future"""
+        key = self.user_key(user_id)
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._executor.submit(self._refresh, key, client, user_id, password, previous)
+                self._refreshing[key] = future
+        return future
+
+    def _refresh(self, key, client, user_id, password, previous):
+        try:
+            case_list = fetch_case_list(client, user_id, password)
+            with self._lock:
+                self._logins += 1
+                self._refreshes += 1
+            if not case_list:
+                # 可能是密碼已變更：移除舊狀態，下次改為直接登入並顯示錯誤
+                self.invalidate(user_id)
+                return {"case_list": None, "added": [], "removed": []}
+            self.put(user_id, password, case_list)
+            added, removed = diff_case_lists(previous.case_list, case_list)
+            return {"case_list": case_list, "added": added, "removed": removed}
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def stats(self):
+        """登入次數、重用次數與背景更新次數"""
+        with self._lock:
+            return {"logins": self._logins, "reused": self._reused, "refreshes": self._refreshes}
@@ -0,0 +1,93 @@
+# 批次執行引擎：並行模式與下載/提交管線模式，結果都維持原始順序
+import queue  # 管線階段之間的有界佇列
+import threading  # 背景下載執行緒
+from concurrent.futures import ThreadPoolExecutor, as_completed  # 執行緒池
+
+DEFAULT_MAX_WORKERS = 4  # 預設同時處理的案件數
+
+
+def run_concurrent(items, worker, max_workers=DEFAULT_MAX_WORKERS, on_result=None):
+    """
+    以執行緒池並行執行 worker(item)，回傳與 items 相同順序的結果列表
+
+    worker 需自行處理例外並回傳結果；on_result(index, result, done_count)
+    會在呼叫端執行緒中依完成順序呼叫，可用來更新進度條等 UI 元件。
+    """
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    max_workers = max(1, min(int(max_workers), len(items)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="punch") as executor:
+        futures = {executor.submit(worker, item): i for i, item in enumerate(items)}
+        done_count = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            done_count += 1
+            if on_result:
+                on_result(index, results[index], done_count)
+
+    return results
+
+
+DEFAULT_PREFETCH = 3  # 管線模式預先下載的案件數（佇列上限）
+
+
+def run_pipeline(items, fetch_stage, submit_stage, prefetch=DEFAULT_PREFETCH, on_result=None):
+    """
+    兩階段管線：背景執行緒依序執行 fetch_stage(item) 預先下載，
+    呼叫端執行緒依序執行 submit_stage(item, fetched) 提交
+
+    兩階段以有上限的佇列連接，最多只會暫存 prefetch 筆下載結果，
+    因此案件再多記憶體用量也有上限。fetch_stage 與 submit_stage 需自行
+    處理例外；on_result(index, result, done_count) 在呼叫端執行緒呼叫。
+    """
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    pending = queue.Queue(maxsize=max(1, int(prefetch)))
+    stop = threading.Event()
+    done_marker = object()
+
+    def producer():
+        """下載階段：依序預取並放入佇列，佇列滿時等待"""
+        try:
+            for index, item in enumerate(items):
+                if stop.is_set():
+                    return
+                fetched = fetch_stage(item)
+                while not stop.is_set():
+                    try:
+                        pending.put((index, item, fetched), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            while not stop.is_set():
+                try:
+                    pending.put(done_marker, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    thread = threading.Thread(target=producer, name="punch-prefetch", daemon=True)
+    thread.start()
+    try:
+        done_count = 0
+        while True:
+            entry = pending.get()
+            if entry is done_marker:
+                break
+            index, item, fetched = entry
+            results[index] = submit_stage(item, fetched)
+            done_count += 1
+            if on_result:
+                on_result(index, results[index], done_count)
+    finally:
+        # 提交階段中斷時通知下載階段停止，避免卡在佇列上
+        stop.set()
+        thread.join()
+
+    return results
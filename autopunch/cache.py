@@ -0,0 +1,93 @@
+# 有容量上限的 LRU + TTL 快取，只存放精簡的欄位 dict，並以版本號支援寫入後更新
+import threading  # 執行緒鎖
+import time  # 過期判斷
+from collections import OrderedDict  # LRU 順序
+
+DEFAULT_MAXSIZE = 500  # 最多保留幾筆
+DEFAULT_TTL = 60  # 每筆保留秒數
+
+
+class TTLCache:
+    """
+    執行緒安全的 LRU 快取：超過容量時淘汰最久未使用的項目，過期項目視為不存在
+
+    每個項目帶有版本號，每次寫入加一。讀取端可以在發出請求前記下 version()，
+    回應後以 put(..., expected_version=...) 寫入；若期間已有較新的寫入
+    （例如提交成功後的 write-through），舊的回應就不會覆蓋新資料。
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        """取得未過期的值，並標記為最近使用"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def version(self, key):
+        """目前的版本號（從未寫入為 0），過期項目仍保留版本號直到被淘汰"""
+        with self._lock:
+            entry = self._data.get(key)
+            return 0 if entry is None else entry[1]
+
+    def put(self, key, value, expected_version=None):
+        """
+        存入值並將版本號加一，必要時淘汰最久未使用的項目
+
+        指定 expected_version 時，只有版本號未變才寫入；回傳是否寫入。
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            current = 0 if entry is None else entry[1]
+            if expected_version is not None and current != expected_version:
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, current + 1, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, key):
+        """讓項目失效但保留版本號，避免較舊的回應再寫回來"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data[key] = (0.0, entry[1] + 1, None)
+
+    def pop(self, key, default=None):
+        """移除並回傳值"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[2]
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        """回傳命中、未命中、淘汰次數與目前筆數"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
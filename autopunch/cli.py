@@ -0,0 +1,304 @@
+# 命令列入口：不需 Streamlit 即可執行批次打卡，輸出機器可讀的 JSON
+#
+# 用法：python -m autopunch run --user 1889 --message "今日訪視完成"
+#       密碼請以環境變數 AUTOPUNCH_PASSWORD 提供（或 --password，但會留在 shell 歷史中）
+#
+#       python -m autopunch schedule --roster roster.json --message "今日訪視完成"
+#       roster.json 為員工列表，例如：
+#       [{"user": "1889", "password_env": "PW_1889"}, {"user": "1890", "message": "外訪", "cases": "00020,00021"}]
+import argparse  # 命令列參數
+import json  # 輸出格式
+import os  # 讀取環境變數
+import sys  # 標準輸出與結束代碼
+
+PASSWORD_ENV = "AUTOPUNCH_PASSWORD"
+
+# 結束代碼
+EXIT_OK = 0  # 全部成功或略過
+EXIT_FAILED = 1  # 有案件失敗
+EXIT_LOGIN_FAILED = 2  # 無法取得案件清單
+EXIT_DEADLINE = 3  # 批次時限已到，有案件未處理（可用 --resume 繼續）
+
+
+def emit(record, stream=None):
+    """輸出一行 JSON"""
+    stream = stream or sys.stdout
+    stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def case_state(result):
+    """把結果狀態轉成機器可讀的代碼"""
+    from autopunch.runner import is_success, is_skipped, is_deadline_skipped
+    if is_success(result):
+        return "success"
+    if is_skipped(result):
+        return "skipped"
+    if is_deadline_skipped(result):
+        return "deadline"
+    return "failed"
+
+
+def exit_code(summary):
+    """依批次統計決定結束代碼：有失敗為 1，有案件因時限未處理為 3"""
+    if summary["failed_count"]:
+        return EXIT_FAILED
+    if summary["deadline_count"]:
+        return EXIT_DEADLINE
+    return EXIT_OK
+
+
+def add_run_arguments(parser):
+    """批次打卡的共用參數（預設值與各模組的 DEFAULT_* 相同）"""
+    from autopunch.batch import DEFAULT_MAX_WORKERS
+    from autopunch.deadline import DEFAULT_BATCH_DEADLINE
+    from autopunch.ratelimit import DEFAULT_MAX_RATE, DEFAULT_RATE
+    from autopunch.resilience import DEFAULT_MAX_ATTEMPTS
+
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="並行或非同步處理時同時處理的案件數")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="自適應速率限制的起始速率（每秒請求數）")
+    parser.add_argument("--max-rate", type=float, default=DEFAULT_MAX_RATE, help="自適應速率限制的最高速率")
+    parser.add_argument("--no-rate-limit", action="store_true", help="停用速率限制")
+    parser.add_argument("--no-http-cache", action="store_true", help="停用本機回應快取（條件式請求）")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_ATTEMPTS - 1,
+                        help="暫時性錯誤的重試次數（0 表示不重試）")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_BATCH_DEADLINE,
+                        help="批次時限秒數，時限到時尚未處理的案件不送出，結束代碼為 3（預設 0，不限制）")
+    parser.add_argument("--no-skip", action="store_true", help="不略過今日已打卡的案件")
+    parser.add_argument("--verify", action="store_true", help="略過前先核對工作日誌")
+    parser.add_argument("--base-url", help="API 基礎網址（預設為正式系統或 AUTOPUNCH_BASE_URL）")
+
+
+def build_parser():
+    """建立命令列參數解析器"""
+    from autopunch.batch import DEFAULT_PREFETCH
+    from autopunch.scheduler import DEFAULT_MAX_WORKERS as SCHEDULER_MAX_WORKERS, DEFAULT_PER_USER_LIMIT
+
+    parser = argparse.ArgumentParser(prog="autopunch", description="自動打卡系統命令列工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="為一位員工執行批次打卡")
+    run.add_argument("--user", required=True, help="員工編號")
+    run.add_argument("--message", required=True, help="打卡訊息")
+    run.add_argument("--password", help=f"登入密碼（建議改用環境變數 {PASSWORD_ENV}）")
+    run.add_argument("--cases", help="逗號分隔的案件清單；省略時以帳密登入抓取")
+    run.add_argument("--resume", action="store_true", help="繼續今天未完成的批次")
+    run.add_argument("--mode", choices=["concurrent", "pipeline", "async"], default="concurrent",
+                     help="concurrent：並行處理；pipeline：預先下載、依序提交；async：非同步處理（需安裝 httpx）")
+    run.add_argument("--prefetch", type=int, default=DEFAULT_PREFETCH, help="管線處理時預先下載的案件數")
+    run.add_argument("--timings", metavar="FILE", help="把各案件各階段的耗時寫入檔案")
+    run.add_argument("--timings-format", choices=["json", "otel"], default="json",
+                     help="json：計時紀錄與統計；otel：OpenTelemetry OTLP/JSON 追蹤")
+    add_run_arguments(run)
+
+    schedule = subparsers.add_parser("schedule", help="依名單為多位員工執行批次打卡（共用執行緒池）")
+    schedule.add_argument("--roster", required=True, help="員工名單 JSON 檔")
+    schedule.add_argument("--message", help="預設打卡訊息（名單中未指定 message 時使用）")
+    schedule.add_argument("--per-user", type=int, default=DEFAULT_PER_USER_LIMIT, help="每位員工同時執行的工作數")
+    add_run_arguments(schedule)
+    schedule.set_defaults(workers=SCHEDULER_MAX_WORKERS)
+    return parser
+
+
+def make_resilience(args):
+    """依參數建立重試策略與斷路器"""
+    from autopunch.resilience import CircuitBreaker, RetryPolicy
+    return RetryPolicy(max_attempts=args.retries + 1), CircuitBreaker()
+
+
+def make_client(args):
+    """建立 HTTP 客戶端"""
+    from autopunch.api import BASE_URL
+    from autopunch.http_client import PunchClient
+    retry_policy, breaker = make_resilience(args)
+    response_cache = None
+    if not args.no_http_cache:
+        from autopunch.response_cache import ResponseCache
+        response_cache = ResponseCache()
+    return PunchClient(
+        args.base_url or BASE_URL, retry_policy=retry_policy, breaker=breaker, response_cache=response_cache
+    )
+
+
+def make_limiter(args):
+    """依參數建立速率限制器"""
+    if args.no_rate_limit:
+        return None
+    from autopunch.ratelimit import AdaptiveRateLimiter
+    return AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate)
+
+
+def cmd_run(args):
+    """run 子命令：抓取案件清單（或繼續未完成的批次）並逐筆打卡"""
+    from autopunch.api import fetch_case_list, get_taiwan_date_string, split_case_list
+    from autopunch.cache import TTLCache
+    from autopunch.journal import BatchJournal
+    from autopunch.deadline import make_deadline
+    from autopunch.punch_index import PunchIndex
+    from autopunch.runner import PunchBatch, summarize, is_deadline_skipped
+    from autopunch.timing import BatchTimings
+
+    client = make_client(args)
+    today = get_taiwan_date_string()
+    journal = BatchJournal()
+    punch_message = args.message
+
+    unfinished = journal.last_unfinished_run(args.user, today) if args.resume else None
+    if unfinished:
+        # 沿用上次批次的案件清單、訊息與已完成的結果
+        run_id = unfinished["run_id"]
+        case_list = unfinished["case_list"]
+        case_keys = unfinished["case_keys"]
+        punch_message = unfinished["punch_message"]
+        finished = unfinished["results"]
+    else:
+        case_list = args.cases
+        if not case_list:
+            password = args.password or os.environ.get(PASSWORD_ENV)
+            if not password:
+                emit({"type": "error", "error": f"需要密碼：請設定 {PASSWORD_ENV} 或使用 --password"})
+                return EXIT_LOGIN_FAILED
+            case_list = fetch_case_list(client, args.user, password)
+            if not case_list:
+                emit({"type": "error", "user": args.user, "error": "無法取得案件清單"})
+                return EXIT_LOGIN_FAILED
+        case_keys = split_case_list(case_list)
+        journal.prune(today)
+        run_id = journal.start_run(args.user, case_keys, case_list, punch_message, today)
+        finished = [None] * len(case_keys)
+
+    punch_index = None
+    if not args.no_skip:
+        punch_index = PunchIndex()
+        punch_index.prune(today)
+
+    bridge = None
+    batch_class = PunchBatch
+    if args.mode == "async":
+        from autopunch.async_api import AsyncBridge, AsyncPunchBatch, async_available
+        if not async_available():
+            emit({"type": "error", "error": "非同步模式需要安裝 httpx"})
+            return EXIT_FAILED
+        bridge = AsyncBridge(
+            client.base_url, retry_policy=client.retry_policy, breaker=client.breaker,
+            response_cache=client.response_cache
+        )
+        client = bridge.client
+        batch_class = AsyncPunchBatch
+
+    batch = batch_class(
+        client, args.user, case_list, punch_message, today,
+        case_keys=case_keys, cache=TTLCache(), limiter=make_limiter(args),
+        punch_index=punch_index, verify_punched=args.verify, deadline=make_deadline(args.deadline),
+        timings=BatchTimings(name=f"punch_batch {args.user}") if args.timings else None
+    )
+    pending = [i for i, r in enumerate(finished) if r is None]
+    emit({"type": "start", "user": args.user, "run_id": run_id, "date": today,
+          "total": len(case_keys), "pending": len(pending)})
+
+    def on_result(index, result, done_count):
+        finished[index] = result
+        if not is_deadline_skipped(result):
+            # 因時限未處理的案件不寫入日誌，之後可用 --resume 繼續
+            journal.record_result(run_id, index, result)
+        emit({"type": "case", "user": args.user, "index": index, "state": case_state(result), **result})
+
+    if bridge:
+        bridge.run_batch(batch, pending, concurrency=args.workers, on_result=on_result)
+        bridge.close()
+    else:
+        batch.run(pending, mode=args.mode, max_workers=args.workers, prefetch=args.prefetch, on_result=on_result)
+    if not any(is_deadline_skipped(r) for r in finished):
+        journal.finish_run(run_id)
+
+    if batch.timings is not None:
+        with open(args.timings, "w", encoding="utf-8") as f:
+            if args.timings_format == "otel":
+                json.dump(batch.timings.to_otel(), f)
+            else:
+                f.write(batch.timings.to_json())
+
+    summary = summarize(finished)
+    emit({"type": "summary", "user": args.user, "run_id": run_id, **summary})
+    return exit_code(summary)
+
+
+def load_roster(path, default_message=None):
+    """讀取員工名單 JSON，密碼可直接寫在 password 或以 password_env 指定環境變數"""
+    from autopunch.scheduler import RosterEntry
+
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)
+
+    roster = []
+    for row in rows:
+        message = row.get("message", default_message)
+        if message is None:
+            raise ValueError(f"員工 {row['user']} 沒有打卡訊息，請在名單中指定 message 或使用 --message")
+        password = row.get("password")
+        if row.get("password_env"):
+            password = os.environ.get(row["password_env"])
+        roster.append(RosterEntry(str(row["user"]), message, password=password, case_list=row.get("cases")))
+    return roster
+
+
+def cmd_schedule(args):
+    """schedule 子命令：名單中所有員工共用一個執行緒池打卡"""
+    from autopunch.api import get_taiwan_date_string
+    from autopunch.cache import TTLCache
+    from autopunch.deadline import make_deadline
+    from autopunch.punch_index import PunchIndex
+    from autopunch.scheduler import Scheduler, STATE_DEADLINE, STATE_DONE
+
+    try:
+        roster = load_roster(args.roster, args.message)
+    except (OSError, ValueError, KeyError) as e:
+        emit({"type": "error", "error": f"無法讀取名單：{e}"})
+        return EXIT_LOGIN_FAILED
+
+    today = get_taiwan_date_string()
+    punch_index = None
+    if not args.no_skip:
+        punch_index = PunchIndex()
+        punch_index.prune(today)
+
+    scheduler = Scheduler(
+        make_client(args), today, max_workers=args.workers, per_user_limit=args.per_user,
+        cache=TTLCache(), limiter=make_limiter(args), punch_index=punch_index, verify_punched=args.verify,
+        deadline=make_deadline(args.deadline)
+    )
+    emit({"type": "start", "date": today, "users": len(roster)})
+
+    def on_result(user_id, index, result):
+        emit({"type": "case", "user": user_id, "index": index, "state": case_state(result), **result})
+
+    def on_progress(user):
+        emit({"type": "progress", **user.as_dict()})
+
+    progress = scheduler.run(roster, on_progress=on_progress, on_result=on_result)
+
+    codes = set()
+    for user in progress.values():
+        record = user.as_dict()
+        if user.state == STATE_DONE:
+            codes.add(exit_code(record))
+        else:
+            codes.add(EXIT_DEADLINE if user.state == STATE_DEADLINE else EXIT_FAILED)
+        emit({"type": "summary", **record})
+    # 有失敗優先回報失敗，其次為時限未處理
+    for code in (EXIT_FAILED, EXIT_DEADLINE):
+        if code in codes:
+            return code
+    return EXIT_OK
+
+
+COMMANDS = {
+    "run": cmd_run,
+    "schedule": cmd_schedule,
+}
+
+
+def main(argv=None):
+    """命令列主程式，回傳結束代碼"""
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
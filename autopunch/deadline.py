@@ -0,0 +1,55 @@
+# 批次時限：把整批的時間上限換算成每個請求剩餘可用的連線與讀取逾時
+import time  # 計時
+
+DEFAULT_BATCH_DEADLINE = 0  # 介面預設的批次時限（秒），0 表示不限制；案件多時設時限會留下未處理的案件
+DEFAULT_CONNECT_TIMEOUT = 5  # 建立連線的逾時秒數
+DEFAULT_READ_TIMEOUT = 30  # 等待回應的逾時秒數
+
+
+class DeadlineExceeded(Exception):
+    """批次時限已到，請求未送出"""
+
+
+class Deadline:
+    """整批共用的截止時間，所有執行緒讀取同一個值（唯讀，不需要鎖）"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        """剩餘秒數（不小於 0）"""
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        """時限已到時拋出 DeadlineExceeded，否則回傳剩餘秒數"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"已超過批次時限 {self.seconds:g} 秒")
+        return remaining
+
+    def timeout(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT, clip_read=True):
+        """
+        回傳以剩餘時間截斷的 (連線逾時, 讀取逾時)，時限已到時拋出 DeadlineExceeded
+
+        clip_read=False 用於寫入請求：請求一旦送出就等到原本的讀取逾時，
+        避免客戶端先放棄、伺服器卻已寫入（剩餘時間只用來決定是否送出）。
+        """
+        remaining = self.check()
+        return min(connect, remaining), (min(read, remaining) if clip_read else read)
+
+
+def split_timeout(timeout):
+    """把逾時設定統一為 (連線逾時, 讀取逾時)"""
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def make_deadline(seconds):
+    """秒數大於 0 時建立 Deadline，否則回傳 None（不限制）"""
+    return Deadline(seconds) if seconds and seconds > 0 else None
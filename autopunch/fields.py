@@ -0,0 +1,88 @@
+# 宣告式欄位規格：一次走訪就取出所有需要的 input / textarea 值
+
+
+def read_input(el):
+    """input 欄位：取 value 屬性"""
+    return el.get("value", "").strip()
+
+
+def read_textarea(el):
+    """textarea 欄位：取內文"""
+    return el.text.strip()
+
+
+# 各標籤的取值方式；不在表中的標籤一律視為空字串
+DEFAULT_READERS = {
+    "input": read_input,
+    "textarea": read_textarea,
+}
+
+
+class FieldSpec:
+    """單一欄位的宣告：欄位 ID、各標籤的取值方式與找不到時的預設值"""
+
+    __slots__ = ("field_id", "readers", "default")
+
+    def __init__(self, field_id, readers=None, default=""):
+        self.field_id = field_id
+        self.readers = readers or DEFAULT_READERS
+        self.default = default
+
+    def read(self, el):
+        """依元素標籤取值"""
+        reader = self.readers.get(el.name)
+        return reader(el) if reader else self.default
+
+
+class FieldExtractor:
+    """
+    由欄位規格編譯而成的擷取器
+
+    只走訪文件一次，遇到第一個 ID 相符的元素就取值（與 doc.find(id=...) 相同），
+    所有欄位都找到後立即停止。新增欄位只需要增加規格，不會增加走訪次數。
+    """
+
+    def __init__(self, specs):
+        self.specs = list(specs)
+        self.field_ids = [spec.field_id for spec in self.specs]
+        self._by_id = {spec.field_id: spec for spec in self.specs}
+
+    def extract(self, doc):
+        """回傳依規格順序排列的欄位值 dict"""
+        from bs4 import Tag  # 判斷節點類型（延後載入，只匯入規格時不必載入 bs4）
+
+        found = {}
+        remaining = len(self._by_id)
+        for el in doc.descendants:
+            if not isinstance(el, Tag):
+                continue
+            field_id = el.get("id")
+            if field_id in self._by_id and field_id not in found:
+                found[field_id] = self._by_id[field_id].read(el)
+                remaining -= 1
+                if not remaining:
+                    break
+
+        return {
+            spec.field_id: found.get(spec.field_id, spec.default)
+            for spec in self.specs
+        }
+
+
+# 案件編輯頁面的欄位規格（順序即為提交 payload 的欄位順序）
+CASE_EDIT_FIELDS = [
+    FieldSpec("f_key"),
+    FieldSpec("f_case_name"),
+    FieldSpec("f_person_id"),
+    FieldSpec("f_person2_id"),
+    FieldSpec("f_event_date"),
+    FieldSpec("f_alert_date"),
+    FieldSpec("f_log"),
+    FieldSpec("f_note"),
+    FieldSpec("f_to_do"),
+    FieldSpec("f_dir"),
+    FieldSpec("f_risk"),
+    FieldSpec("f_doc"),
+]
+
+CASE_EDIT_EXTRACTOR = FieldExtractor(CASE_EDIT_FIELDS)
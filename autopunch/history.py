@@ -0,0 +1,233 @@
+# 執行歷史：以精簡格式保存每次批次結果，記憶體中只留最近幾次，較舊的移到本機 SQLite，需要時再分頁讀回
+import json  # 序列化
+import os  # 讀取環境變數
+import sqlite3  # 本機持久化
+import sys  # 字串 intern
+import threading  # 執行緒鎖
+from array import array  # 緊湊的狀態碼陣列
+from collections import deque  # 最近的執行紀錄
+from datetime import datetime, timedelta  # 清理舊紀錄
+from enum import IntEnum  # 狀態碼
+
+from autopunch.runner import is_success, is_skipped, is_deadline_skipped  # 結果狀態判斷
+from autopunch.storage import data_path  # 資料存放位置
+
+DEFAULT_HISTORY_FILE = "run_history.sqlite3"
+HISTORY_CAP_ENV = "AUTOPUNCH_HISTORY_CAP"  # 記憶體中保留幾次執行紀錄
+DEFAULT_HISTORY_CAP = 20
+DEFAULT_RETENTION_DAYS = 7  # 磁碟上的紀錄保留天數
+
+
+class CaseStatus(IntEnum):
+    """案件結果狀態碼（取代 emoji 狀態字串）"""
+    SUCCESS = 0
+    SKIPPED = 1
+    DEADLINE = 2
+    FAILED = 3
+    ERROR = 4
+
+
+STATUS_LABELS = {
+    CaseStatus.SUCCESS: "✅ 成功",
+    CaseStatus.SKIPPED: "⏭️ 略過",
+    CaseStatus.DEADLINE: "⌛ 超過批次時限",
+    CaseStatus.FAILED: "❌ 失敗",
+    CaseStatus.ERROR: "❌ 錯誤",
+}
+
+
+def status_code(result):
+    """把案件結果 dict 轉成狀態碼"""
+    if is_success(result):
+        return CaseStatus.SUCCESS
+    if is_deadline_skipped(result):
+        return CaseStatus.DEADLINE
+    if is_skipped(result):
+        return CaseStatus.SKIPPED
+    if result["status"] == "❌ 錯誤":
+        return CaseStatus.ERROR
+    return CaseStatus.FAILED
+
+
+def history_cap():
+    """記憶體中保留的執行次數（環境變數 AUTOPUNCH_HISTORY_CAP，預設 20）"""
+    try:
+        return max(1, int(os.environ.get(HISTORY_CAP_ENV, DEFAULT_HISTORY_CAP)))
+    except ValueError:
+        return DEFAULT_HISTORY_CAP
+
+
+class RunRecord:
+    """
+    一次批次的精簡紀錄：案件編號（intern 後共用字串）與一個位元組的狀態碼陣列
+
+    只保留失敗案件的說明，成功與略過的說明可由狀態碼還原，不另外保存。
+    """
+
+    __slots__ = ("timestamp", "mode", "case_keys", "statuses", "failures")
+
+    def __init__(self, timestamp, mode, case_keys, statuses, failures=None):
+        self.timestamp = timestamp
+        self.mode = mode
+        self.case_keys = case_keys  # tuple[str]
+        self.statuses = statuses  # array("B")
+        self.failures = failures or {}  # {案件位置: 失敗說明}
+
+    @classmethod
+    def from_results(cls, timestamp, results, mode):
+        """由案件結果 dict 列表建立紀錄"""
+        case_keys = tuple(sys.intern(r["case"]) for r in results)
+        statuses = array("B", (status_code(r) for r in results))
+        failures = {
+            i: r.get("details", "") for i, r in enumerate(results)
+            if statuses[i] >= CaseStatus.FAILED
+        }
+        return cls(timestamp, mode, case_keys, statuses, failures)
+
+    @property
+    def total_count(self):
+        return len(self.statuses)
+
+    @property
+    def success_count(self):
+        return self.statuses.count(CaseStatus.SUCCESS)
+
+    @property
+    def skipped_count(self):
+        return self.statuses.count(CaseStatus.SKIPPED)
+
+    @property
+    def deadline_count(self):
+        return self.statuses.count(CaseStatus.DEADLINE)
+
+    def rows(self):
+        """依案件順序產生 (案件編號, 狀態文字, 失敗說明)"""
+        for i, key in enumerate(self.case_keys):
+            yield key, STATUS_LABELS[CaseStatus(self.statuses[i])], self.failures.get(i, "")
+
+    def to_json(self):
+        """存到磁碟用的精簡 JSON"""
+        return json.dumps({
+            "t": self.timestamp,
+            "m": self.mode,
+            "k": self.case_keys,
+            "s": self.statuses.tobytes().hex(),
+            "f": self.failures,
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(
+            data["t"], data["m"],
+            tuple(sys.intern(k) for k in data["k"]),
+            array("B", bytes.fromhex(data["s"])),
+            {int(i): msg for i, msg in data["f"].items()},
+        )
+
+
+class HistoryStore:
+    """以 SQLite 保存從記憶體移出的執行紀錄，依擁有者（瀏覽器 session）分開"""
+
+    def __init__(self, path=None, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path or data_path(DEFAULT_HISTORY_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    owner TEXT NOT NULL,
+                    saved_at TEXT NOT NULL,
+                    record TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS history_by_owner ON history (owner, id);
+                """
+            )
+        self.prune(retention_days)
+
+    def save(self, owner, record):
+        """寫入一筆紀錄"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO history (owner, saved_at, record) VALUES (?, ?, ?)",
+                (owner, datetime.now().isoformat(timespec="seconds"), record.to_json())
+            )
+
+    def count(self, owner):
+        """某擁有者在磁碟上的紀錄數"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def load(self, owner, offset=0, limit=10):
+        """由新到舊讀回紀錄"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM history WHERE owner = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (owner, limit, offset)
+            ).fetchall()
+        return [RunRecord.from_json(row[0]) for row in rows]
+
+    def clear(self, owner):
+        """刪除某擁有者的所有紀錄"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM history WHERE owner = ?", (owner,))
+
+    def prune(self, retention_days):
+        """刪除超過保留天數的紀錄"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM history WHERE saved_at < ?", (cutoff,))
+
+
+class RunHistory:
+    """
+    一個 session 的執行歷史：記憶體中最多保留 cap 次，超過時最舊的移到 HistoryStore
+
+    page() 由新到舊分頁讀取，先讀記憶體中的紀錄，不夠時再從磁碟補。
+    """
+
+    def __init__(self, owner, store=None, cap=None):
+        self.owner = owner
+        self.store = store
+        self.cap = cap or history_cap()
+        self._recent = deque()
+
+    def append(self, timestamp, results, mode):
+        """加入一次批次結果，回傳建立的紀錄"""
+        record = RunRecord.from_results(timestamp, results, mode)
+        self._recent.append(record)
+        while len(self._recent) > self.cap:
+            oldest = self._recent.popleft()
+            if self.store is not None:
+                self.store.save(self.owner, oldest)
+        return record
+
+    def __len__(self):
+        """總執行次數（含已移到磁碟的紀錄）"""
+        spilled = self.store.count(self.owner) if self.store is not None else 0
+        return len(self._recent) + spilled
+
+    def __bool__(self):
+        return bool(self._recent) or len(self) > 0
+
+    def latest(self):
+        """最近一次的紀錄，沒有時回傳 None"""
+        return self._recent[-1] if self._recent else None
+
+    def page(self, page=0, page_size=5):
+        """第 page 頁（由新到舊，從 0 起算）的紀錄"""
+        start = page * page_size
+        recent = list(reversed(self._recent))
+        records = recent[start:start + page_size]
+        if len(records) < page_size and self.store is not None:
+            offset = max(0, start - len(recent))
+            records += self.store.load(self.owner, offset, page_size - len(records))
+        return records
+
+    def clear(self):
+        """清除記憶體與磁碟上的紀錄"""
+        self._recent.clear()
+        if self.store is not None:
+            self.store.clear(self.owner)
@@ -0,0 +1,183 @@
+# 共用 HTTP 連線層：連線池 + keep-alive，讓所有 API 呼叫重用同一批 TCP/TLS 連線
+#
+# 同一個客戶端由所有員工共用，因此不保存任何 cookie（否則一位員工登入時後端設定的 cookie
+# 會被帶到其他員工的請求上）；需要 cookie 的請求由呼叫端以 cookies= 明確傳入。
+import threading  # 統計資料的執行緒鎖
+import time  # 計時
+from http.cookiejar import DefaultCookiePolicy  # 拒絕保存 cookie
+import requests  # HTTP 請求
+from requests.adapters import HTTPAdapter  # 連線池設定
+from urllib3.exceptions import NewConnectionError  # 連線建立失敗
+from autopunch.ratelimit import parse_retry_after  # Retry-After 解析
+from autopunch.resilience import ERROR_CONNECT, ERROR_READ  # 錯誤階段分類
+from autopunch.timing import span, STAGE_NETWORK, STAGE_THROTTLE  # 階段計時
+from autopunch.deadline import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, split_timeout  # 連線 / 讀取逾時
+
+# 預設連線池設定
+DEFAULT_POOL_CONNECTIONS = 4  # 最多保留幾個主機的連線池
+DEFAULT_POOL_MAXSIZE = 8  # 每個主機最多保留幾條連線
+DEFAULT_TIMEOUT = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)  # (連線逾時, 讀取逾時) 秒數
+
+
+class PunchClient:
+    """共用的 HTTP 客戶端，包裝 requests.Session 並統計連線重用情況"""
+
+    def __init__(self, base_url, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, timeout=DEFAULT_TIMEOUT,
+                 retry_policy=None, breaker=None, response_cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.response_cache = response_cache  # 持久化回應快取（條件式請求），None 表示不使用
+        self.session = requests.Session()
+        self.session.cookies.set_policy(no_cookie_policy())
+        # pool_block=False：連線用完時臨時建立新連線，而不是卡住等待
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._total_elapsed = 0.0
+        self._retry_count = 0
+
+    def post(self, path, data=None, headers=None, timeout=None, limiter=None, idempotent=True, deadline=None,
+             stream=False, cookies=None):
+        """
+        對 BASE_URL 底下的路徑發送 POST 請求，可選擇套用速率限制器
+
+        有設定重試策略時，暫時性錯誤會退避後重試；寫入請求請傳 idempotent=False。
+        斷路器開啟時直接拋出 CircuitOpenError，不會送出請求。
+        有 deadline 時時限已到就不送出，讀取逾時以剩餘時間截斷（寫入請求除外，避免送出後
+        客戶端先放棄而重複寫入），剩餘時間不夠等待下次重試就不再重試。
+        stream=True 時只讀到回應標頭，內容由呼叫端以 iter_content() 讀取並負責關閉。
+        cookies 只隨這次請求送出，不會保存到共用的連線上。
+        """
+        attempt = 0
+        while True:
+            if deadline:
+                # 先確認時限，時限已到就不佔用斷路器的試探名額
+                deadline.check()
+            probe = self.breaker.before_request() if self.breaker else None
+            try:
+                resp = self._send(path, data, headers, timeout, limiter, deadline, stream, idempotent, cookies)
+            except requests.RequestException as e:
+                if self.breaker:
+                    self.breaker.record_failure()
+                policy = self.retry_policy
+                if not policy or not policy.should_retry_error(request_error_kind(e), attempt, idempotent):
+                    raise
+                delay = policy.delay(attempt)
+                if deadline and deadline.remaining() <= delay:
+                    raise
+            except BaseException:
+                # 與後端無關的結束（批次時限、工作被取消）：歸還試探名額，不計入成功或失敗
+                if self.breaker:
+                    self.breaker.release_probe(probe)
+                raise
+            else:
+                if self.breaker:
+                    # 5xx 代表後端異常；4xx（含 429）代表後端仍有回應
+                    if resp.status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                policy = self.retry_policy
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if not policy or not policy.should_retry_status(resp.status_code, attempt, idempotent, retry_after):
+                    return resp
+                delay = policy.delay(attempt, retry_after)
+                if deadline and deadline.remaining() <= delay:
+                    return resp
+                resp.close()
+            with self._lock:
+                self._retry_count += 1
+            with span(STAGE_THROTTLE):
+                time.sleep(delay)
+            attempt += 1
+
+    def _send(self, path, data, headers, timeout, limiter, deadline, stream=False, idempotent=True, cookies=None):
+        """送出單次請求並回報給速率限制器；寫入請求（idempotent=False）的讀取逾時不以時限截斷"""
+        if limiter:
+            with span(STAGE_THROTTLE):
+                limiter.acquire()
+        timeout = timeout or self.timeout
+        if deadline:
+            # 等待速率限制後才截斷，讓逾時反映真正剩下的時間
+            timeout = deadline.timeout(*split_timeout(timeout), clip_read=idempotent)
+        started = time.monotonic()
+        try:
+            with span(STAGE_NETWORK):
+                resp = self.session.post(
+                    f"{self.base_url}/{path.lstrip('/')}",
+                    data=data,
+                    headers=headers,
+                    timeout=timeout,
+                    stream=stream,
+                    cookies=cookies
+                )
+        except requests.RequestException:
+            if limiter:
+                limiter.record(None, time.monotonic() - started)
+            raise
+        if limiter:
+            limiter.record(
+                resp.status_code,
+                time.monotonic() - started,
+                retry_after=parse_retry_after(resp.headers.get("Retry-After"))
+            )
+        with self._lock:
+            self._request_count += 1
+            self._total_elapsed += resp.elapsed.total_seconds()
+        return resp
+
+    def stats(self):
+        """回傳連線重用統計：請求數、新建連線數、重用次數與平均延遲"""
+        # requests 會依 TLS 設定產生不同的連線池 key，因此加總所有連線池
+        pools = self.adapter.poolmanager.pools
+        created = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                created += pool.num_connections
+        with self._lock:
+            requests_made = self._request_count
+            total_elapsed = self._total_elapsed
+            retries = self._retry_count
+        connections = min(created, requests_made)
+        reused = requests_made - connections
+        return {
+            "requests": requests_made,
+            "connections": connections,
+            "reused": reused,
+            "reuse_ratio": reused / requests_made if requests_made else 0.0,
+            "avg_latency": total_elapsed / requests_made if requests_made else 0.0,
+            "retries": retries,
+            "circuit": self.breaker.state if self.breaker else None,
+        }
+
+    def close(self):
+        """關閉所有連線"""
+        self.session.close()
+
+
+def no_cookie_policy():
+    """不接受也不送出任何 cookie 的 cookie 政策，給所有員工共用的連線使用"""
+    return DefaultCookiePolicy(allowed_domains=[])
+
+
+def request_error_kind(exc):
+    """判斷 requests 例外發生在連線建立階段或讀取回應階段"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return ERROR_CONNECT
+    if isinstance(exc, requests.ConnectionError):
+        # 連線建立失敗時 urllib3 會包成 NewConnectionError；連線被重設則是 ProtocolError
+        reason = exc.args[0] if exc.args else None
+        reason = getattr(reason, "reason", reason)
+        if isinstance(reason, NewConnectionError):
+            return ERROR_CONNECT
+    return ERROR_READ
@@ -0,0 +1,140 @@
+# 背景批次工作：批次在背景執行緒執行，頁面只需輪詢工作狀態，重新整理或操作元件都不會中斷批次
+import itertools  # 工作編號
+from collections import Counter, deque  # 各狀態的案件數、最近完成的案件
+import threading  # 執行緒鎖
+import time  # 時間戳記
+from concurrent.futures import ThreadPoolExecutor  # 背景執行緒池
+
+DEFAULT_JOB_WORKERS = 4  # 同時執行的批次數，超過的批次排隊等待
+DEFAULT_KEEP_FINISHED = 50  # 保留多少個已結束的工作供頁面讀取結果
+DEFAULT_RECENT_RESULTS = 10  # 進行中的畫面只顯示最近完成的幾個案件
+
+# 工作狀態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class Job:
+    """
+    一個背景批次：記錄進度與結果，供其他執行緒讀取
+
+    work(job) 在背景執行緒執行，每完成一個案件呼叫 job.record(index, result)；
+    頁面以 snapshot() 取得一致的狀態複本，不直接讀取進行中的資料。
+    """
+
+    def __init__(self, job_id, owner, total, finished=None, meta=None):
+        self.job_id = job_id
+        self.owner = owner
+        self.total = total
+        self.meta = meta or {}  # 批次相關物件（速率限制器、計時等），結束後顯示統計用
+        self.state = JOB_QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._results = list(finished) if finished is not None else [None] * total
+        self._done = sum(1 for r in self._results if r is not None)
+        self._status_counts = Counter(r["status"] for r in self._results if r is not None)
+        self._recent = deque(maxlen=DEFAULT_RECENT_RESULTS)  # 依完成順序，最新的在最後
+        self._last = None
+        self._last_index = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.state in (JOB_DONE, JOB_FAILED)
+
+    def record(self, index, result, done_count=None):
+        """記錄一個案件的結果（可直接當作批次引擎的 on_result）"""
+        with self._lock:
+            previous = self._results[index]
+            if previous is None:
+                self._done += 1
+            else:
+                self._status_counts[previous["status"]] -= 1
+            self._status_counts[result["status"]] += 1
+            self._results[index] = result
+            self._recent.append(result)
+            self._last = result
+            self._last_index = index
+
+    def snapshot(self, results=True):
+        """
+        目前狀態的複本：state、done、total、status_counts、recent、last（與其索引 last_index）、error
+
+        results=True 時另含完整的 results 列表；進行中輪詢時傳 False，複製成本不隨案件數增加。
+        """
+        with self._lock:
+            snapshot = {
+                "job_id": self.job_id,
+                "state": self.state,
+                "done": self._done,
+                "total": self.total,
+                "status_counts": {status: n for status, n in self._status_counts.items() if n},
+                "recent": list(self._recent),
+                "last": self._last,
+                "last_index": self._last_index,
+                "error": self.error,
+            }
+            if results:
+                snapshot["results"] = list(self._results)
+            return snapshot
+
+    def _run(self, work):
+        self.state = JOB_RUNNING
+        self.started_at = time.time()
+        try:
+            work(self)
+            self.state = JOB_DONE
+        except Exception as e:
+            self.error = str(e)
+            self.state = JOB_FAILED
+        finally:
+            self.finished_at = time.time()
+
+
+class JobManager:
+    """背景批次管理：共用一個執行緒池，同一位員工同時只能有一個進行中的批次"""
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, keep_finished=DEFAULT_KEEP_FINISHED):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="punch-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, owner, total, work, finished=None, **meta):
+        """建立工作並排入執行緒池；owner 已有進行中的工作時拋出 ValueError"""
+        with self._lock:
+            if self._active_job(owner):
+                raise ValueError(f"{owner} 已有批次正在執行")
+            job = Job(f"job-{next(self._ids)}", owner, total, finished=finished, meta=meta)
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(job._run, work)
+        return job
+
+    def get(self, job_id):
+        """依編號取得工作，不存在（或已被清除）時回傳 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, owner):
+        """owner 排隊中或執行中的工作"""
+        with self._lock:
+            return self._active_job(owner)
+
+    def _active_job(self, owner):
+        for job in self._jobs.values():
+            if job.owner == owner and not job.finished:
+                return job
+        return None
+
+    def _prune(self):
+        """只保留最近 keep_finished 個已結束的工作"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.job_id]
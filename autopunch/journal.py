@@ -0,0 +1,113 @@
+# 批次執行日誌：逐筆記錄案件進度，連線中斷後可以只處理未完成的案件
+import json  # 結果序列化
+import sqlite3  # 本機持久化
+import threading  # 執行緒鎖
+import uuid  # 批次編號
+from datetime import datetime  # 記錄時間
+
+from autopunch.storage import data_path  # 資料存放位置
+
+DEFAULT_JOURNAL_FILE = "batch_journal.sqlite3"
+
+
+class BatchJournal:
+    """以 SQLite 保存每個批次與每筆案件的處理進度"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DEFAULT_JOURNAL_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    case_list TEXT NOT NULL,
+                    punch_message TEXT NOT NULL,
+                    punch_date TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    finished_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS run_cases (
+                    run_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    case_key TEXT NOT NULL,
+                    result TEXT,
+                    PRIMARY KEY (run_id, idx)
+                );
+                CREATE INDEX IF NOT EXISTS runs_by_user ON runs (user_id, punch_date, finished_at);
+                """
+            )
+
+    def start_run(self, user_id, case_keys, case_list, punch_message, punch_date):
+        """建立新批次，所有案件先標記為未完成，回傳批次編號"""
+        run_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, NULL)",
+                (run_id, user_id, case_list, punch_message, punch_date,
+                 datetime.now().isoformat(timespec="seconds"))
+            )
+            self._conn.executemany(
+                "INSERT INTO run_cases VALUES (?, ?, ?, NULL)",
+                [(run_id, i, key) for i, key in enumerate(case_keys)]
+            )
+        return run_id
+
+    def record_result(self, run_id, index, result):
+        """記錄一筆案件的處理結果"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE run_cases SET result = ? WHERE run_id = ? AND idx = ?",
+                (json.dumps(result, ensure_ascii=False), run_id, index)
+            )
+
+    def finish_run(self, run_id):
+        """標記批次已完成"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?",
+                (datetime.now().isoformat(timespec="seconds"), run_id)
+            )
+
+    def last_unfinished_run(self, user_id, punch_date):
+        """
+        取得某員工當天最近一個未完成的批次，沒有時回傳 None
+
+        回傳 dict：run_id、case_keys、case_list、punch_message、
+        results（依案件順序，未完成的為 None）、pending（未完成案件的索引）
+        """
+        with self._lock:
+            run = self._conn.execute(
+                "SELECT run_id, case_list, punch_message, created_at FROM runs "
+                "WHERE user_id = ? AND punch_date = ? AND finished_at IS NULL "
+                "ORDER BY created_at DESC, rowid DESC LIMIT 1",
+                (user_id, punch_date)
+            ).fetchone()
+            if run is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT idx, case_key, result FROM run_cases WHERE run_id = ? ORDER BY idx",
+                (run[0],)
+            ).fetchall()
+
+        results = [None if row[2] is None else json.loads(row[2]) for row in rows]
+        return {
+            "run_id": run[0],
+            "case_list": run[1],
+            "punch_message": run[2],
+            "created_at": run[3],
+            "case_keys": [row[1] for row in rows],
+            "results": results,
+            "pending": [i for i, result in enumerate(results) if result is None],
+        }
+
+    def prune(self, before_date):
+        """刪除某日期之前的批次紀錄"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM run_cases WHERE run_id IN (SELECT run_id FROM runs WHERE punch_date < ?)",
+                (before_date,)
+            )
+            self._conn.execute("DELETE FROM runs WHERE punch_date < ?", (before_date,))
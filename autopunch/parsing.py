@@ -0,0 +1,113 @@
+# HTML 解析後端：案件清單可切換 selectolax / lxml / html.parser，並只解析需要的區塊
+import os  # 讀取環境變數
+from bs4 import BeautifulSoup, SoupStrainer  # HTML 解析
+from autopunch.fields import CASE_EDIT_EXTRACTOR  # 案件編輯頁面欄位規格
+from autopunch.timing import span, STAGE_PARSE, STAGE_EXTRACT  # 階段計時
+
+# 案件編輯頁面中需要的欄位 ID
+CASE_EDIT_FIELD_IDS = CASE_EDIT_EXTRACTOR.field_ids
+
+# 可用的後端名稱（依速度排序）
+BACKENDS = ["selectolax", "lxml", "html.parser"]
+
+# 以環境變數強制指定後端，預設 auto 會自動挑選已安裝中最快的
+BACKEND_ENV = "AUTOPUNCH_HTML_BACKEND"
+
+# 只保留案件清單表格，以及案件編輯頁面中需要的欄位元素
+CASE_LIST_STRAINER = SoupStrainer("table", id="caselist1")
+CASE_EDIT_STRAINER = SoupStrainer(id=CASE_EDIT_FIELD_IDS)
+
+
+def _has_module(name):
+    """檢查選用套件是否已安裝"""
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends():
+    """回傳目前環境可用的後端"""
+    return [name for name in BACKENDS if name == "html.parser" or _has_module(name)]
+
+
+def resolve_backend(name=None):
+    """決定要使用的後端：指定值 → 環境變數 → 自動挑選"""
+    name = name or os.environ.get(BACKEND_ENV, "auto")
+    available = available_backends()
+    if name == "auto":
+        return available[0]
+    if name not in available:
+        raise ValueError(f"HTML 解析後端 {name} 無法使用，可用的後端：{', '.join(available)}")
+    return name
+
+
+def _soup_feature(backend):
+    """BeautifulSoup 使用的 tree builder（selectolax 無法產生 soup，改用 lxml 或 html.parser）"""
+    if backend in ("selectolax", "lxml") and _has_module("lxml"):
+        return "lxml"
+    return "html.parser"
+
+
+def _selectolax_tree(html):
+    """建立 selectolax 解析樹，優先使用 lexbor 引擎"""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser(html)
+    except ImportError:
+        from selectolax.parser import HTMLParser
+        return HTMLParser(html)
+
+
+def parse_case_list(html, backend=None):
+    """從案件清單頁面取出每行第2個td的案件編號，找不到表格時回傳 None"""
+    backend = resolve_backend(backend)
+
+    if backend == "selectolax":
+        table = _selectolax_tree(html).css_first("table#caselist1")
+        if table is None:
+            return None
+        tbody = table.css_first("tbody")
+        rows = (tbody or table).css("tr")
+        case_numbers = []
+        for row in rows:
+            tds = row.css("td")
+            if len(tds) >= 2:
+                case_number = tds[1].text(deep=True, separator="", strip=True)
+                if case_number:
+                    case_numbers.append(case_number)
+        return case_numbers
+
+    soup = BeautifulSoup(html, _soup_feature(backend), parse_only=CASE_LIST_STRAINER)
+    table = soup.find("table", {"id": "caselist1"})
+    if not table:
+        return None
+
+    rows = table.find("tbody").find_all("tr") if table.find("tbody") else table.find_all("tr")
+    case_numbers = []
+    for row in rows:
+        tds = row.find_all("td")
+        if len(tds) >= 2:  # 確保至少有2個td
+            case_number = tds[1].get_text(strip=True)  # 第2個td（索引1）
+            if case_number:
+                case_numbers.append(case_number)
+    return case_numbers
+
+
+def parse_case_edit(html):
+    """
+    解析案件編輯頁面，只保留需要的欄位元素
+
+    一律使用 html.parser：欄位值（尤其是工作日誌）會原樣提交回去，lxml 會把 \r\n 換成 \n、
+    以不同規則解碼沒有分號的字元參照，並把 NUL 換成 U+FFFD，提交後會改寫原本的內容。
+    """
+    return BeautifulSoup(html, "html.parser", parse_only=CASE_EDIT_STRAINER)
+
+
+def parse_case_edit_fields(html):
+    """解析案件編輯頁面並直接回傳欄位值 dict（不保留解析樹）"""
+    with span(STAGE_PARSE):
+        doc = parse_case_edit(html)
+    with span(STAGE_EXTRACT):
+        return CASE_EDIT_EXTRACTOR.extract(doc)
@@ -0,0 +1,74 @@
+# 已打卡索引：記錄 (員工, 案件, 日期, 訊息雜湊)，重新執行時可在連線前略過
+import hashlib  # 訊息雜湊
+import sqlite3  # 本機持久化
+import threading  # 執行緒鎖
+from datetime import datetime  # 記錄時間
+
+from autopunch.storage import data_path  # 資料存放位置
+
+DEFAULT_INDEX_FILE = "punch_index.sqlite3"
+
+
+def message_hash(punch_message):
+    """打卡訊息的雜湊值（不保存訊息原文）"""
+    return hashlib.sha256(punch_message.encode("utf-8")).hexdigest()[:16]
+
+
+def log_has_punch(fields, punch_message):
+    """檢查工作日誌最上方是否已經是這則打卡訊息"""
+    message = punch_message.strip()
+    return bool(message) and fields.get("f_log", "").startswith(message)
+
+
+class PunchIndex:
+    """以 SQLite 保存成功的打卡紀錄，供重新執行時略過已完成的案件"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path(DEFAULT_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS punches (
+                    user_id TEXT NOT NULL,
+                    case_key TEXT NOT NULL,
+                    punch_date TEXT NOT NULL,
+                    message_hash TEXT NOT NULL,
+                    f_key TEXT,
+                    punched_at TEXT NOT NULL,
+                    PRIMARY KEY (user_id, case_key, punch_date, message_hash)
+                )
+                """
+            )
+
+    def punched_cases(self, user_id, punch_date, punch_message):
+        """回傳某員工當天以這則訊息打卡成功的案件編號集合"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_key FROM punches WHERE user_id = ? AND punch_date = ? AND message_hash = ?",
+                (user_id, punch_date, message_hash(punch_message))
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def record(self, user_id, case_key, punch_date, punch_message, f_key=None):
+        """記錄一筆成功的打卡"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO punches VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, case_key, punch_date, message_hash(punch_message),
+                 None if f_key is None else str(f_key), datetime.now().isoformat(timespec="seconds"))
+            )
+
+    def forget(self, user_id, case_key, punch_date, punch_message):
+        """移除一筆紀錄（例如核對工作日誌後發現實際上沒有打卡）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM punches WHERE user_id = ? AND case_key = ? AND punch_date = ? AND message_hash = ?",
+                (user_id, case_key, punch_date, message_hash(punch_message))
+            )
+
+    def prune(self, before_date):
+        """刪除某日期之前的紀錄，避免索引無限成長"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM punches WHERE punch_date < ?", (before_date,))
@@ -0,0 +1,117 @@
+# 自適應速率限制：令牌桶控制請求速率，並以 AIMD 依伺服器回應自動調整
+import asyncio  # 非同步等待
+import threading  # 執行緒鎖
+import time  # 計時
+
+# 預設速率設定（每秒請求數）
+DEFAULT_RATE = 2.0
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_LATENCY_THRESHOLD = 3.0  # 回應超過幾秒視為壅塞
+
+
+class AdaptiveRateLimiter:
+    """
+    令牌桶 + AIMD（加法增加、乘法減少）的速率限制器
+
+    每個請求前呼叫 acquire() 取得令牌；請求結束後呼叫 record() 回報
+    狀態碼與回應時間。回應正常時速率逐步增加，遇到 429、5xx、連線錯誤
+    或回應過慢時速率減半，429 若帶有 Retry-After 則暫停到指定時間。
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 latency_threshold=DEFAULT_LATENCY_THRESHOLD, increase_step=0.5,
+                 decrease_factor=0.5, burst=1):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.latency_threshold = latency_threshold
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._healthy = 0
+        self._throttled = 0
+
+    def _refill(self, now):
+        """依經過時間補充令牌（需持有鎖）"""
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def reserve(self):
+        """嘗試取得令牌：成功回傳 0，否則回傳建議等待的秒數（不會阻塞）"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """取得一個令牌，必要時等待"""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """取得一個令牌（asyncio 版本，等待時不會卡住事件迴圈）"""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def record(self, status_code, elapsed, retry_after=None):
+        """回報一次請求結果，status_code 為 None 代表連線錯誤"""
+        congested = (
+            status_code is None
+            or status_code == 429
+            or status_code >= 500
+            or elapsed > self.latency_threshold
+        )
+        with self._lock:
+            now = time.monotonic()
+            if not congested:
+                self._healthy += 1
+                # 每個正常回應加 step/rate，約等於每秒增加 step
+                self.rate = min(self.max_rate, self.rate + self.increase_step / max(self.rate, 1.0))
+                return
+
+            self._throttled += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            # 同一波壅塞只減速一次，避免並行請求同時回報造成速率驟降
+            if now - self._last_decrease >= 1.0 / self.rate:
+                self._refill(now)
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._tokens = min(self._tokens, 0.0)
+                self._last_decrease = now
+
+    def stats(self):
+        """回傳目前速率與健康/壅塞回應次數"""
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "healthy": self._healthy,
+                "throttled": self._throttled,
+            }
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 標頭（只支援秒數格式），無法解析時回傳 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,144 @@
+# 重試與斷路器：暫時性錯誤以指數退避加隨機抖動重試，後端故障時快速失敗
+import random  # 隨機抖動
+import threading  # 執行緒鎖
+import time  # 計時
+
+# 錯誤發生的階段
+ERROR_CONNECT = "connect"  # 連線建立失敗，請求確定沒有送達伺服器
+ERROR_READ = "read"  # 已送出請求但讀取回應失敗（逾時、連線被重設），伺服器可能已處理
+
+# 可重試的 HTTP 狀態碼
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+# 寫入請求只在伺服器明確表示「未處理」時重試：429 限流、503 暫停服務
+UNSAFE_RETRYABLE_STATUSES = frozenset({429, 503})
+
+# 斷路器狀態
+STATE_CLOSED = "closed"  # 正常
+STATE_OPEN = "open"  # 後端故障，直接失敗
+STATE_HALF_OPEN = "half_open"  # 冷卻後試探一次
+
+DEFAULT_MAX_ATTEMPTS = 3  # 含第一次在內的最多嘗試次數
+DEFAULT_PROBE_TIMEOUT = 60.0  # 試探請求超過這麼多秒沒有回報結果時，改放行下一個試探
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟中，請求未送出"""
+
+
+class RetryPolicy:
+    """
+    重試策略：指數退避 + 完全隨機抖動（full jitter）
+
+    idempotent=False 的寫入請求（例如提交打卡）只在連線建立失敗或 429/503 時重試，
+    避免伺服器其實已寫入、重試卻讓工作日誌出現兩次打卡訊息。
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=0.5, max_delay=8.0, max_retry_after=30.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def should_retry_error(self, kind, attempt, idempotent=True):
+        """連線錯誤是否重試（attempt 從 0 起算）"""
+        if attempt + 1 >= self.max_attempts:
+            return False
+        return kind == ERROR_CONNECT or idempotent
+
+    def should_retry_status(self, status_code, attempt, idempotent=True, retry_after=None):
+        """HTTP 狀態碼是否重試；Retry-After 超過上限時放棄，不在批次中久候"""
+        if attempt + 1 >= self.max_attempts:
+            return False
+        allowed = RETRYABLE_STATUSES if idempotent else UNSAFE_RETRYABLE_STATUSES
+        if status_code not in allowed:
+            return False
+        return retry_after is None or retry_after <= self.max_retry_after
+
+    def delay(self, attempt, retry_after=None):
+        """第 attempt 次重試前的等待秒數；伺服器有指定 Retry-After 時以它為準"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    斷路器：連續失敗達門檻後開啟，在 reset_timeout 秒內所有請求直接失敗；
+    冷卻後進入半開狀態，只放行一個試探請求，成功才恢復正常
+
+    試探請求若因批次時限、工作取消等與後端無關的原因結束，呼叫端以 release_probe()
+    歸還試探名額；未歸還的試探超過 probe_timeout 秒後也視為作廢，改放行下一個試探。
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, probe_timeout=DEFAULT_PROBE_TIMEOUT):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_id = 0  # 每次放行試探時遞增，避免舊的試探歸還新的名額
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """目前狀態（開啟且冷卻結束時回報為半開）"""
+        with self._lock:
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return STATE_HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self):
+        return self.state == STATE_OPEN
+
+    def before_request(self):
+        """
+        請求前檢查，斷路器開啟時拋出 CircuitOpenError
+
+        本次請求為半開狀態的試探時回傳試探編號（交給 release_probe()），否則回傳 None。
+        """
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return None
+            now = time.monotonic()
+            if self._state == STATE_OPEN:
+                remaining = self.reset_timeout - (now - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"後端暫時無法使用，{remaining:.0f} 秒後再試")
+                self._state = STATE_HALF_OPEN
+                self._probing = False
+            # 半開：只放行一個試探請求；試探逾時未回報時視為作廢
+            if self._probing and now - self._probe_started < self.probe_timeout:
+                raise CircuitOpenError("後端暫時無法使用，正在試探是否恢復")
+            self._probing = True
+            self._probe_id += 1
+            self._probe_started = now
+            return self._probe_id
+
+    def release_probe(self, probe):
+        """試探請求沒有結果就結束（未送出、被取消）：歸還試探名額，不改變斷路器狀態"""
+        if probe is None:
+            return
+        with self._lock:
+            if self._probing and self._probe_id == probe:
+                self._probing = False
+
+    def record_success(self):
+        """請求成功：重設失敗次數並關閉斷路器"""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """請求失敗：累計失敗次數，達門檻或試探失敗時開啟斷路器"""
+        with self._lock:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
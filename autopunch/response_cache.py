@@ -0,0 +1,159 @@
+# 持久化 HTTP 回應快取：以 SQLite 保存案件清單與案件編輯頁面的解析結果，並以條件式請求重新驗證
+#
+# 後端回應帶有 ETag 或 Last-Modified 時，保存驗證值與解析後的結果（不保存 HTML 原文）。
+# 下次請求帶上 If-None-Match / If-Modified-Since，後端回 304 時直接沿用解析結果，
+# 不必重新下載與解析。每次仍會送出請求，因此帳密驗證與資料是否最新都由後端判斷。
+# 重新啟動或多個程序共用同一個資料夾時，快取仍然有效。
+import hashlib  # 快取鍵
+import json  # 序列化解析結果
+import sqlite3  # 本機持久化
+import threading  # 執行緒鎖
+import time  # 保存時間
+
+from autopunch.storage import data_path  # 資料存放位置
+
+DEFAULT_CACHE_FILE = "http_cache.sqlite3"
+DEFAULT_TTL = 24 * 60 * 60  # 項目可用來重新驗證的秒數（後端回 304 時重新計算）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 快取總大小上限，超過時淘汰最久未使用的項目
+
+
+class CachedResponse:
+    """一筆快取項目：驗證值與解析結果"""
+
+    __slots__ = ("etag", "last_modified", "value")
+
+    def __init__(self, etag, last_modified, value):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.value = value
+
+    def conditional_headers(self):
+        """條件式請求的標頭"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """以 SQLite 保存的回應快取，具有 TTL 與總大小上限（LRU 淘汰），多執行緒共用"""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or data_path(DEFAULT_CACHE_FILE)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0  # 後端回 304，沿用解析結果
+        self._misses = 0  # 沒有可用的項目，或後端回傳新內容
+        self._evictions = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used_at);
+                """
+            )
+        self.prune()
+
+    @staticmethod
+    def key(*parts):
+        """由請求內容產生快取鍵（請勿傳入密碼）"""
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """取得未過期的項目，沒有時回傳 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, value FROM responses WHERE key = ? AND stored_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(row[0], row[1], json.loads(row[2]))
+
+    def revalidated(self, key, entry):
+        """後端回 304：重新計算 TTL，回傳快取中的解析結果"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET stored_at = ?, used_at = ? WHERE key = ?", (now, now, key))
+            self._hits += 1
+        return entry.value
+
+    def store(self, key, headers, value):
+        """
+        保存新的回應；沒有 ETag 或 Last-Modified 時無法重新驗證，不保存並移除舊項目
+
+        回傳是否保存。
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self._lock:
+            self._misses += 1
+        if not etag and not last_modified:
+            self.invalidate(key)
+            return False
+
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        size = len(data.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            self.invalidate(key)
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, data, size, now, now)
+            )
+            self._evict()
+        return True
+
+    def invalidate(self, key):
+        """移除一筆項目"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self):
+        """總大小超過上限時，從最久未使用的項目開始淘汰（需持有鎖）"""
+        if not self.max_bytes:
+            return
+        excess = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY used_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._evictions += len(victims)
+
+    def prune(self):
+        """刪除已過期的項目"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+
+    def stats(self):
+        """項目數、總大小與 304 命中統計"""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                "entries": count,
+                "bytes": size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,263 @@
+# 批次打卡流程：下載 → 提取欄位 → 提交，供 Streamlit 介面與命令列共用
+from contextlib import nullcontext  # 不計時時的空範圍
+from autopunch.api import (  # API 呼叫
+    fetch_case_edit, extract_fields, remember_submitted_fields, submit_punch, split_case_list
+)
+from autopunch.batch import run_concurrent, run_pipeline, DEFAULT_MAX_WORKERS, DEFAULT_PREFETCH  # 批次引擎
+from autopunch.punch_index import log_has_punch  # 已打卡核對
+
+# 執行方式
+MODE_CONCURRENT = "concurrent"  # 並行處理
+MODE_PIPELINE = "pipeline"  # 管線處理
+
+
+def create_success_result(key, case_name, f_key):
+    """建立成功的案件結果"""
+    return {
+        "case": key,
+        "status": "✅ 成功",
+        "message": f"案件：{case_name}",
+        "details": f"f_key: {f_key}，已更新工作日誌",
+        "f_key": f_key
+    }
+
+
+def create_error_result(key, message, details):
+    """建立失敗的案件結果"""
+    return {
+        "case": key,
+        "status": "❌ 失敗",
+        "message": message,
+        "details": details
+    }
+
+
+def create_system_error_result(key, error):
+    """建立系統錯誤的案件結果"""
+    return {
+        "case": key,
+        "status": "❌ 錯誤",
+        "message": "系統錯誤",
+        "details": str(error)
+    }
+
+
+def create_skipped_result(key, message, details):
+    """建立略過的案件結果"""
+    return {
+        "case": key,
+        "status": "⏭️ 略過",
+        "message": message,
+        "details": details
+    }
+
+
+def create_deadline_result(key):
+    """建立因批次時限到期而未處理的案件結果（不寫入日誌，可稍後繼續；不算略過也不算失敗）"""
+    return {
+        "case": key,
+        "status": "⌛ 超過批次時限",
+        "message": "未處理",
+        "details": "批次時限已到，此案件未送出，可稍後繼續未完成的批次",
+        "deadline": True
+    }
+
+
+def is_success(result):
+    """案件是否打卡成功"""
+    return result["status"].startswith("✅")
+
+
+def is_skipped(result):
+    """案件是否被略過"""
+    return result["status"].startswith("⏭️")
+
+
+def is_deadline_skipped(result):
+    """案件是否因批次時限到期而未處理"""
+    return result.get("deadline", False)
+
+
+def summarize(results):
+    """統計批次結果：總數、成功、略過、因時限未處理、失敗"""
+    success_count = sum(1 for r in results if is_success(r))
+    skipped_count = sum(1 for r in results if is_skipped(r))
+    deadline_count = sum(1 for r in results if is_deadline_skipped(r))
+    return {
+        "total_count": len(results),
+        "success_count": success_count,
+        "skipped_count": skipped_count,
+        "deadline_count": deadline_count,
+        "failed_count": len(results) - success_count - skipped_count - deadline_count,
+    }
+
+
+class PunchBatch:
+    """
+    一次批次打卡：案件清單、打卡訊息與共用資源（連線、快取、速率限制、已打卡索引）
+
+    prepare() 與 complete() 分別是下載與提交階段，可以直接交給並行或管線引擎；
+    兩者都會自行處理例外並回傳結果 dict，且不會呼叫任何 UI。
+    """
+
+    def __init__(self, client, user_id, case_list, punch_message, today,
+                 case_keys=None, cache=None, limiter=None, punch_index=None, verify_punched=False,
+                 deadline=None, timings=None):
+        self.client = client
+        self.user_id = user_id
+        self.case_list = case_list
+        self.punch_message = punch_message
+        self.today = today
+        self.case_keys = case_keys if case_keys is not None else split_case_list(case_list)
+        self.cache = cache
+        self.limiter = limiter
+        self.punch_index = punch_index
+        self.verify_punched = verify_punched
+        self.deadline = deadline
+        self.timings = timings  # BatchTimings，None 表示不計時
+
+        # 今天以相同訊息打卡成功的案件
+        self.already_punched = set()
+        if punch_index is not None:
+            self.already_punched = punch_index.punched_cases(user_id, today, punch_message)
+
+    def traced(self, index):
+        """計時範圍：有設定 timings 時，範圍內各階段的時間記錄到此案件"""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.case(index, self.case_keys[index])
+
+    def deadline_expired(self):
+        """批次時限是否已到"""
+        return self.deadline is not None and self.deadline.expired
+
+    def failure_details(self, details):
+        """失敗說明：批次時限已到或斷路器開啟時改為說明原因"""
+        if self.deadline_expired():
+            return "批次時限已到，請求未完成"
+        breaker = getattr(self.client, "breaker", None)
+        if breaker is not None and breaker.is_open:
+            return "伺服器暫時無法連線，已暫停送出請求，請稍後再試"
+        return details
+
+    # 以下 before_* / after_* 為不需連線的判斷，同步與非同步版本共用，兩者只差在 HTTP 呼叫
+
+    def before_fetch(self, index):
+        """
+        下載前的判斷，回傳 (案件編號, 直接結果, 是否核對)
+
+        直接結果不為 None 時不必下載（時限已到、已打卡略過）；是否核對為 True 時
+        要重新下載（不使用快取）並交給 after_verify() 核對工作日誌。
+        """
+        key = self.case_keys[index]
+        if self.deadline_expired():
+            return key, (None, create_deadline_result(key)), False
+        if key in self.already_punched:
+            if self.verify_punched:
+                return key, None, True
+            return key, (None, create_skipped_result(key, "今日已打卡", "索引中已有今天的打卡紀錄，未連線直接略過")), False
+        return key, None, False
+
+    def after_fetch(self, key, fields):
+        """下載結果轉成 (fields, 失敗結果)"""
+        if fields:
+            return fields, None
+        if self.deadline_expired():
+            # 下載失敗且時限已到：尚未寫入任何資料，視同未開始
+            return None, create_deadline_result(key)
+        return None, create_error_result(key, "無法取得案件資料", self.failure_details("請檢查案件編號是否正確"))
+
+    def after_verify(self, key, prepared):
+        """核對階段：工作日誌已有這則訊息才略過，否則移除索引紀錄並重新打卡"""
+        fields, failure = prepared
+        if failure:
+            return prepared
+        if log_has_punch(fields, self.punch_message):
+            return None, create_skipped_result(key, "今日已打卡", "已核對工作日誌，略過此案件")
+        try:
+            self.punch_index.forget(self.user_id, key, self.today, self.punch_message)
+        except Exception as e:
+            # 索引寫入失敗（例如 SQLite 被鎖定）：與其他寫入相同，回報系統錯誤而不提交
+            return None, create_system_error_result(key, e)
+        return fields, None
+
+    def before_submit(self, key, prepared):
+        """提交前的判斷並建立 payload，回傳 (payload, 直接結果)；直接結果不為 None 時不提交"""
+        fields, failure = prepared
+        if failure:
+            return None, failure
+        if self.deadline_expired():
+            # 管線中已下載但尚未提交的案件
+            return None, create_deadline_result(key)
+        try:
+            return extract_fields(fields, self.today, self.user_id, self.punch_message), None
+        except Exception as e:
+            return None, create_system_error_result(key, e)
+
+    def after_submit(self, key, payload, response):
+        """提交後更新快取與已打卡索引，回傳案件結果"""
+        case_name = payload.get('f_case_name', '未知')
+        f_key = payload.get('f_key', '未知')
+        if self.cache is not None:
+            remember_submitted_fields(self.cache, key, self.user_id, payload, bool(response))
+        if not response:
+            return create_error_result(key, f"案件：{case_name}", self.failure_details("提交打卡資料失敗"))
+
+        # 記錄到已打卡索引，下次重新執行可直接略過
+        if self.punch_index is not None:
+            self.punch_index.record(self.user_id, key, self.today, self.punch_message, f_key)
+        return create_success_result(key, case_name, f_key)
+
+    def fetch(self, key, fresh=False):
+        """下載案件欄位值，回傳 (fields, 失敗結果)"""
+        try:
+            return self.after_fetch(key, fetch_case_edit(
+                self.client, key, self.case_list, self.user_id,
+                cache=self.cache, limiter=self.limiter, fresh=fresh, deadline=self.deadline
+            ))
+        except Exception as e:
+            return None, create_system_error_result(key, e)
+
+    def prepare(self, index):
+        """下載階段：已打卡的案件直接略過（或先核對），其餘下載案件資料"""
+        with self.traced(index):
+            key, result, verify = self.before_fetch(index)
+            if result is not None:
+                return result
+            prepared = self.fetch(key, fresh=verify)
+            return self.after_verify(key, prepared) if verify else prepared
+
+    def complete(self, index, prepared):
+        """提交階段：提取欄位 → 提交打卡，回傳案件結果"""
+        with self.traced(index):
+            key = self.case_keys[index]
+            payload, result = self.before_submit(key, prepared)
+            if result is not None:
+                return result
+            try:
+                response = submit_punch(self.client, payload, limiter=self.limiter, deadline=self.deadline)
+                return self.after_submit(key, payload, response)
+            except Exception as e:
+                return create_system_error_result(key, e)
+
+    def process(self, index):
+        """處理單一案件：下載 → 提取欄位 → 提交打卡"""
+        return self.complete(index, self.prepare(index))
+
+    def run(self, indices=None, mode=MODE_CONCURRENT, max_workers=DEFAULT_MAX_WORKERS,
+            prefetch=DEFAULT_PREFETCH, on_result=None):
+        """
+        執行批次，回傳與 indices 相同順序的結果列表（預設處理所有案件）
+
+        on_result(index, result, done_count) 的 index 為案件在 case_keys 中的位置，
+        會在呼叫端執行緒中依完成順序呼叫。
+        """
+        indices = list(range(len(self.case_keys))) if indices is None else list(indices)
+        callback = None
+        if on_result:
+            def callback(position, result, done_count):
+                on_result(indices[position], result, done_count)
+
+        if mode == MODE_PIPELINE:
+            return run_pipeline(indices, self.prepare, self.complete, prefetch=prefetch, on_result=callback)
+        return run_concurrent(indices, self.process, max_workers=max_workers, on_result=callback)
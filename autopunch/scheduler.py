@@ -0,0 +1,175 @@
+# 多人批次排程：所有員工共用一個有上限的執行緒池，並以輪流分派保持公平
+from collections import OrderedDict, deque  # 每位員工的工作佇列
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # 共用執行緒池
+
+from autopunch.api import fetch_case_list, split_case_list  # 登入並取得案件清單
+from autopunch.runner import PunchBatch, summarize  # 單一員工的批次流程
+
+DEFAULT_MAX_WORKERS = 8  # 全體同時執行的工作數
+DEFAULT_PER_USER_LIMIT = 2  # 每位員工同時執行的工作數
+
+# 員工進度狀態
+STATE_QUEUED = "queued"  # 等待登入
+STATE_RUNNING = "running"  # 打卡中
+STATE_DONE = "done"  # 全部案件處理完成
+STATE_LOGIN_FAILED = "login_failed"  # 無法取得案件清單
+STATE_DEADLINE = "deadline"  # 批次時限已到，未登入
+
+
+class RosterEntry:
+    """排程中的一位員工：帳號、打卡訊息，以及（可選的）密碼或固定案件清單"""
+
+    __slots__ = ("user_id", "punch_message", "password", "case_list")
+
+    def __init__(self, user_id, punch_message, password=None, case_list=None):
+        self.user_id = user_id
+        self.punch_message = punch_message
+        self.password = password
+        self.case_list = case_list
+
+
+class UserProgress:
+    """單一員工的進度統計"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.state = STATE_QUEUED
+        self.total = 0
+        self.results = []
+        self.error = None
+
+    @property
+    def done(self):
+        """已完成的案件數"""
+        return sum(1 for r in self.results if r is not None)
+
+    def as_dict(self):
+        """轉成可輸出的 dict"""
+        record = {"user": self.user_id, "state": self.state, "total": self.total, "done": self.done}
+        if self.error:
+            record["error"] = self.error
+        if self.state == STATE_DONE:
+            record.update(summarize(self.results))
+        return record
+
+
+class Scheduler:
+    """
+    多人批次打卡排程器
+
+    每位員工有自己的工作佇列（先登入，再逐筆打卡），分派時在員工之間輪流挑選，
+    且每位員工同時執行的工作數不超過 per_user_limit，避免案件多的員工佔滿執行緒池。
+    所有員工共用同一個 HTTP 連線池、速率限制器、快取與已打卡索引。
+    """
+
+    def __init__(self, client, today, max_workers=DEFAULT_MAX_WORKERS, per_user_limit=DEFAULT_PER_USER_LIMIT,
+                 cache=None, limiter=None, punch_index=None, verify_punched=False, deadline=None):
+        self.client = client
+        self.today = today
+        self.max_workers = max(1, int(max_workers))
+        self.per_user_limit = max(1, int(per_user_limit))
+        self.cache = cache
+        self.limiter = limiter
+        self.punch_index = punch_index
+        self.verify_punched = verify_punched
+        self.deadline = deadline  # 整份名單共用的批次時限
+
+    def _login(self, entry):
+        """登入工作：取得案件清單（已指定案件清單時直接使用；時限已到時不再登入）"""
+        if entry.case_list:
+            return entry.case_list
+        if self.deadline is not None and self.deadline.expired:
+            return None
+        return fetch_case_list(self.client, entry.user_id, entry.password, deadline=self.deadline)
+
+    def run(self, roster, on_progress=None, on_result=None):
+        """
+        執行整份名單，回傳 {user_id: UserProgress}
+
+        on_progress(progress) 在員工狀態改變時呼叫；on_result(user_id, index, result)
+        在每筆案件完成時呼叫。兩者都在呼叫端執行緒中執行。
+        """
+        user_ids = [entry.user_id for entry in roster]
+        if len(set(user_ids)) != len(user_ids):
+            raise ValueError("名單中有重複的員工編號")
+
+        progress = OrderedDict((entry.user_id, UserProgress(entry.user_id)) for entry in roster)
+        batches = {}
+        queues = OrderedDict((entry.user_id, deque([("login", entry)])) for entry in roster)
+        in_flight = {user_id: 0 for user_id in queues}
+        futures = {}
+        turn = deque(queues)  # 輪流分派的順序
+
+        def notify(user_id):
+            if on_progress:
+                on_progress(progress[user_id])
+
+        def dispatch(executor):
+            """依輪流順序分派工作，直到執行緒池滿或沒有可分派的工作"""
+            idle_rounds = 0
+            while len(futures) < self.max_workers and idle_rounds < len(turn):
+                user_id = turn[0]
+                turn.rotate(-1)
+                if not queues[user_id] or in_flight[user_id] >= self.per_user_limit:
+                    idle_rounds += 1
+                    continue
+                idle_rounds = 0
+                kind, arg = queues[user_id].popleft()
+                if kind == "login":
+                    future = executor.submit(self._login, arg)
+                else:
+                    future = executor.submit(batches[user_id].process, arg)
+                futures[future] = (user_id, kind, arg)
+                in_flight[user_id] += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="punch-sched") as executor:
+            dispatch(executor)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    user_id, kind, arg = futures.pop(future)
+                    in_flight[user_id] -= 1
+                    user = progress[user_id]
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        value = None
+                        user.error = str(e)
+
+                    if kind == "login":
+                        self._start_user(arg, value, user, batches, queues)
+                        notify(user_id)
+                        continue
+
+                    user.results[arg] = value
+                    if on_result:
+                        on_result(user_id, arg, value)
+                    if user.done == user.total:
+                        user.state = STATE_DONE
+                    notify(user_id)
+                dispatch(executor)
+
+        return progress
+
+    def _start_user(self, entry, case_list, user, batches, queues):
+        """登入完成後建立該員工的批次，並把每筆案件放入他的工作佇列"""
+        if not case_list:
+            if self.deadline is not None and self.deadline.expired:
+                # 未登入或登入失敗且時限已到：視同未開始，不算登入失敗
+                user.state = STATE_DEADLINE
+                user.error = user.error or "批次時限已到，未登入"
+                return
+            user.state = STATE_LOGIN_FAILED
+            user.error = user.error or "無法取得案件清單"
+            return
+
+        batch = PunchBatch(
+            self.client, entry.user_id, case_list, entry.punch_message, self.today,
+            case_keys=split_case_list(case_list), cache=self.cache, limiter=self.limiter,
+            punch_index=self.punch_index, verify_punched=self.verify_punched, deadline=self.deadline
+        )
+        batches[entry.user_id] = batch
+        user.total = len(batch.case_keys)
+        user.results = [None] * user.total
+        user.state = STATE_RUNNING if user.total else STATE_DONE
+        queues[entry.user_id].extend(("case", i) for i in range(user.total))
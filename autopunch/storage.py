@@ -0,0 +1,17 @@
+# 本機資料存放位置（打卡索引、批次日誌等）
+import os  # 路徑與環境變數
+
+# 以環境變數指定資料夾，預設放在使用者家目錄
+DATA_DIR_ENV = "AUTOPUNCH_DATA_DIR"
+
+
+def data_dir():
+    """取得資料夾路徑，不存在時自動建立"""
+    path = os.environ.get(DATA_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".autopunch")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(filename):
+    """取得資料夾中的檔案路徑"""
+    return os.path.join(data_dir(), filename)
@@ -0,0 +1,214 @@
+# 串流讀取案件編輯頁面：邊下載邊解碼、邊找欄位，所有欄位都讀完就停止，並限制回應大小
+#
+# 只掃描標籤，不建立解析樹；確認最後一個欄位的元素已經結束後，才把目前為止的前段
+# 交給 html.parser 解析，因此欄位值與讀完整頁後解析的結果相同。
+import codecs  # 逐段解碼
+import html  # 屬性值中的字元參照
+import os  # 讀取環境變數
+import re  # 標籤掃描
+
+from autopunch.api import response_encoding  # 同步與非同步共用的解碼規則
+from autopunch.parsing import CASE_EDIT_FIELD_IDS, parse_case_edit_fields  # 欄位 ID 與解析
+from autopunch.timing import span, STAGE_NETWORK  # 階段計時
+
+MAX_BODY_ENV = "AUTOPUNCH_MAX_BODY_BYTES"  # 回應大小上限（位元組），0 表示不限制
+DEFAULT_MAX_BODY = 32 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024  # 每次讀取的位元組數
+DRAIN_LIMIT = 64 * 1024  # 提早停止時，剩餘內容在此大小內就讀完，讓連線可以重用
+
+# 開始標籤（屬性值可含 >）。標籤名稱之後必須是空白、/ 或 >，屬性逐字比對，
+# 每個字元只有一種比對方式，標籤還沒讀完時比對失敗也只花線性時間
+START_TAG = r"""<([a-zA-Z][^\s/>]*)((?:[\s/](?:[^>"']|"[^"]*"|'[^']*')*)?)"""
+TAG_PATTERN = re.compile(START_TAG + ">")
+PARTIAL_TAG = re.compile(START_TAG + r"""(?:"[^"]*|'[^']*)?\Z""")  # 讀到緩衝區結尾仍未結束的開始標籤
+# 屬性名稱與值（值可加引號、不加引號或省略）
+ATTR_PATTERN = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+COMMENT_START = "<!--"
+MAX_TAG_CHARS = 64 * 1024  # 單一標籤超過這麼長仍未結束時放棄提早停止，改為讀完整頁
+
+# 內容不含標籤的元素：其中看起來像標籤的文字不算數，一直略過到結束標籤
+RAW_TEXT_ENDS = {
+    name: re.compile(rf"</{name}\s*>", re.I) for name in ("textarea", "script", "style", "title")
+}
+COMMENT_END = re.compile(r"-->")
+RAW_KEEP = 32  # 結束標籤可能被切在兩段之間，保留緩衝區尾端這麼多字元
+
+
+class ResponseTooLarge(Exception):
+    """回應超過大小上限"""
+
+    def __init__(self, limit):
+        super().__init__(f"回應超過大小上限（{limit:,} 位元組）")
+        self.limit = limit
+
+
+def tag_id(attrs):
+    """屬性字串中第一個 id 屬性的值（與 html.parser 相同，解碼字元參照），沒有時回傳 None"""
+    for match in ATTR_PATTERN.finditer(attrs):
+        if match.group(1).lower() == "id":
+            value = next((g for g in match.groups()[1:] if g is not None), "")
+            return html.unescape(value) if "&" in value else value
+    return None
+
+
+def incomplete_tag(buf, start):
+    """buf[start:] 是否可能是還沒讀完的開始標籤或註解開頭"""
+    return COMMENT_START.startswith(buf[start:start + 4]) or PARTIAL_TAG.match(buf, start) is not None
+
+
+def max_body_size():
+    """回應大小上限（環境變數 AUTOPUNCH_MAX_BODY_BYTES，預設 32 MB，0 表示不限制）"""
+    try:
+        return max(0, int(os.environ.get(MAX_BODY_ENV, DEFAULT_MAX_BODY)))
+    except ValueError:
+        return DEFAULT_MAX_BODY
+
+
+class CaseEditStream:
+    """
+    逐段餵入回應內容，回傳是否已讀到所有欄位
+
+    每個欄位 ID 第一次出現在開始標籤時記為找到；textarea 等元素要等到結束標籤，
+    確保欄位值完整。註解與 textarea 內容裡類似標籤的文字都會略過。
+    """
+
+    def __init__(self, encoding="utf-8", field_ids=CASE_EDIT_FIELD_IDS, max_bytes=None):
+        self.max_bytes = max_body_size() if max_bytes is None else max_bytes
+        self.received = 0
+        self.complete = False
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._missing = set(field_ids)
+        self._parts = []  # 已解碼的內容
+        self._buf = ""  # 尚未掃描完的內容
+        self._offset = 0  # _buf 之前已掃描的字元數
+        self._raw_end = None  # 目前略過中的元素結束標籤
+        self._end = None  # 所有欄位都讀完的位置
+        self._scanning = True  # 放棄提早停止後只累積內容
+
+    def feed(self, chunk):
+        """餵入一段位元組；超過大小上限時拋出 ResponseTooLarge"""
+        if self.complete:
+            return True
+        self.received += len(chunk)
+        if self.max_bytes and self.received > self.max_bytes:
+            raise ResponseTooLarge(self.max_bytes)
+        text = self._decoder.decode(chunk)
+        if text:
+            self._parts.append(text)
+            if self._scanning:
+                self._buf += text
+                self._scan()
+        return self.complete
+
+    def _scan(self):
+        buf = self._buf
+        pos = 0
+        while True:
+            if self._raw_end is not None:
+                match = self._raw_end.search(buf, pos)
+                if match is None:
+                    keep = max(pos, len(buf) - RAW_KEEP)
+                    break
+                pos = match.end()
+                self._raw_end = None
+            if not self._missing:
+                self.complete = True
+                self._end = self._offset + pos
+                return
+            lt = buf.find("<", pos)
+            if lt == -1:
+                keep = len(buf)
+                break
+            if buf.startswith(COMMENT_START, lt):
+                pos = lt + len(COMMENT_START)
+                self._raw_end = COMMENT_END
+                continue
+            match = TAG_PATTERN.match(buf, lt)
+            if match is None:
+                if incomplete_tag(buf, lt):
+                    # 保留未完成的標籤，等下一段內容
+                    keep = lt
+                    break
+                # 結束標籤、<!DOCTYPE 或文字中的 <
+                pos = lt + 1
+                continue
+            pos = match.end()
+            field_id = tag_id(match.group(2))
+            if field_id is not None:
+                self._missing.discard(field_id)
+            self._raw_end = RAW_TEXT_ENDS.get(match.group(1).lower())
+        self._offset += keep
+        self._buf = buf[keep:]
+        if len(self._buf) > MAX_TAG_CHARS and self._raw_end is None:
+            # 標籤一直沒有結束（例如屬性值少了結尾引號）：不再掃描，讀完整頁後解析
+            self._scanning = False
+            self._buf = ""
+
+    def finish(self):
+        """回應已讀完：送出解碼器中剩餘的位元組"""
+        if not self.complete:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._parts.append(tail)
+
+    def text(self):
+        """要解析的內容：所有欄位都讀到時只回傳到最後一個欄位為止的前段"""
+        text = "".join(self._parts)
+        return text[:self._end] if self.complete else text
+
+
+def check_content_length(headers, max_bytes):
+    """Content-Length 已超過上限時，不必下載就直接拋出 ResponseTooLarge"""
+    try:
+        length = int(headers.get("Content-Length", ""))
+    except ValueError:
+        return
+    if max_bytes and length > max_bytes:
+        raise ResponseTooLarge(max_bytes)
+
+
+def read_case_edit_fields(resp, max_bytes=None):
+    """從 requests 串流回應（stream=True）讀取並解析案件欄位；不論成功與否都會關閉回應"""
+    stream = CaseEditStream(response_encoding(resp.headers), max_bytes=max_bytes)
+    try:
+        resp.raise_for_status()
+        check_content_length(resp.headers, stream.max_bytes)
+        chunks = resp.iter_content(CHUNK_SIZE)
+        with span(STAGE_NETWORK):
+            for chunk in chunks:
+                if stream.feed(chunk):
+                    break
+            if stream.complete:
+                # 剩下的內容不多時讀完，連線才能放回連線池
+                drained = 0
+                for chunk in chunks:
+                    drained += len(chunk)
+                    if drained > DRAIN_LIMIT:
+                        break
+    finally:
+        resp.close()
+    stream.finish()
+    return parse_case_edit_fields(stream.text())
+
+
+async def read_case_edit_fields_async(resp, max_bytes=None):
+    """從 httpx 串流回應讀取並解析案件欄位（非同步版本）"""
+    stream = CaseEditStream(response_encoding(resp.headers), max_bytes=max_bytes)
+    try:
+        resp.raise_for_status()
+        check_content_length(resp.headers, stream.max_bytes)
+        chunks = resp.aiter_bytes(CHUNK_SIZE)
+        with span(STAGE_NETWORK):
+            async for chunk in chunks:
+                if stream.feed(chunk):
+                    break
+            if stream.complete:
+                drained = 0
+                async for chunk in chunks:
+                    drained += len(chunk)
+                    if drained > DRAIN_LIMIT:
+                        break
+    finally:
+        await resp.aclose()
+    stream.finish()
+    return parse_case_edit_fields(stream.text())
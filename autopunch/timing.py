@@ -0,0 +1,229 @@
+# 熱路徑計時：記錄每個案件各階段（網路、解析、擷取、JSON 編碼、畫面更新）花費的時間
+#
+# 量測點以 span(stage) 包住，只有在 BatchTimings.case() 範圍內才會記錄；
+# 沒有啟用計時時 span() 只多一次 ContextVar 查詢，不影響原本的效能。
+import contextvars  # 每個執行緒 / 非同步工作各自的目前案件
+import json  # 匯出
+import secrets  # 追蹤 ID
+import statistics  # 百分位數
+import threading  # 執行緒鎖
+import time  # 計時
+from contextlib import contextmanager  # 計時範圍
+
+# 階段名稱
+STAGE_THROTTLE = "throttle"  # 等待速率限制或重試退避
+STAGE_NETWORK = "network"  # 送出請求到收完回應
+STAGE_PARSE = "parse"  # 建立 HTML 解析樹
+STAGE_EXTRACT = "extract"  # 擷取欄位、建立打卡 payload
+STAGE_ENCODE = "encode"  # payload 轉成 JSON
+STAGE_RENDER = "render"  # Streamlit 更新畫面
+STAGES = (STAGE_THROTTLE, STAGE_NETWORK, STAGE_PARSE, STAGE_EXTRACT, STAGE_ENCODE, STAGE_RENDER)
+
+STAGE_LABELS = {
+    STAGE_THROTTLE: "等待",
+    STAGE_NETWORK: "網路",
+    STAGE_PARSE: "HTML 解析",
+    STAGE_EXTRACT: "欄位擷取",
+    STAGE_ENCODE: "JSON 編碼",
+    STAGE_RENDER: "畫面更新",
+}
+
+_current_trace = contextvars.ContextVar("autopunch_case_trace", default=None)
+
+
+class CaseTrace:
+    """單一案件的計時紀錄"""
+
+    __slots__ = ("index", "case", "start", "end", "spans")
+
+    def __init__(self, index, case):
+        self.index = index
+        self.case = case
+        self.start = None
+        self.end = None
+        self.spans = []  # (stage, start, end)，perf_counter 秒數
+
+    def add(self, stage, start, end):
+        self.spans.append((stage, start, end))
+
+    def totals(self):
+        """各階段合計秒數"""
+        totals = {}
+        for stage, start, end in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + (end - start)
+        return totals
+
+    def finished_at(self):
+        """案件最後一個紀錄的結束時間（含畫面更新）"""
+        ends = [end for _, _, end in self.spans]
+        if self.end is not None:
+            ends.append(self.end)
+        return max(ends) if ends else self.start
+
+
+@contextmanager
+def span(stage):
+    """記錄一段階段時間到目前的案件；不在任何案件範圍內時什麼都不做"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, start, time.perf_counter())
+
+
+class BatchTimings:
+    """一次批次所有案件的計時紀錄，可彙整統計並匯出為 JSON 或 OpenTelemetry 格式"""
+
+    def __init__(self, name="punch_batch"):
+        self.name = name
+        self.traces = {}
+        self._lock = threading.Lock()
+        # 以同一時間點對齊 perf_counter 與牆上時間，匯出時換算為 Unix 時間
+        self._wall_ns = time.time_ns()
+        self._perf = time.perf_counter()
+
+    def trace(self, index, case):
+        """取得（或建立）案件的計時紀錄；下載與提交階段共用同一筆"""
+        with self._lock:
+            trace = self.traces.get(index)
+            if trace is None:
+                trace = self.traces[index] = CaseTrace(index, case)
+            return trace
+
+    @contextmanager
+    def case(self, index, case):
+        """在這個範圍內呼叫的 span() 都記錄到此案件"""
+        trace = self.trace(index, case)
+        now = time.perf_counter()
+        if trace.start is None:
+            trace.start = now
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.end = time.perf_counter()
+
+    @contextmanager
+    def span(self, index, case, stage):
+        """在案件範圍外（例如畫面更新）直接記錄一段階段時間"""
+        trace = self.trace(index, case)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            trace.add(stage, start, time.perf_counter())
+
+    def case_totals(self, index):
+        """案件各階段合計秒數，沒有紀錄時回傳空 dict"""
+        trace = self.traces.get(index)
+        return trace.totals() if trace else {}
+
+    def stats(self):
+        """每個階段的案件數、合計、平均、p95 與最大值（秒）"""
+        per_stage = {}
+        for trace in list(self.traces.values()):
+            for stage, seconds in trace.totals().items():
+                per_stage.setdefault(stage, []).append(seconds)
+
+        stats = {}
+        for stage in STAGES:
+            values = per_stage.get(stage)
+            if not values:
+                continue
+            ordered = sorted(values)
+            stats[stage] = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": statistics.fmean(values),
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max": ordered[-1],
+            }
+        return stats
+
+    def _unix_ns(self, perf_seconds):
+        return self._wall_ns + int((perf_seconds - self._perf) * 1e9)
+
+    def to_dict(self):
+        """可序列化的計時紀錄（時間為相對批次開始的秒數）"""
+        cases = []
+        for index in sorted(self.traces):
+            trace = self.traces[index]
+            cases.append({
+                "index": trace.index,
+                "case": trace.case,
+                "start": trace.start - self._perf if trace.start is not None else None,
+                "duration": trace.finished_at() - trace.start if trace.start is not None else None,
+                "stages": trace.totals(),
+                "spans": [
+                    {"stage": stage, "start": start - self._perf, "duration": end - start}
+                    for stage, start, end in trace.spans
+                ],
+            })
+        return {"name": self.name, "started_at_unix_ns": self._wall_ns, "stats": self.stats(), "cases": cases}
+
+    def to_json(self):
+        """匯出為 JSON 字串"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_otel(self):
+        """
+        匯出為 OpenTelemetry OTLP/JSON 格式的追蹤資料（dict）
+
+        一個批次為一條追蹤：根 span 為批次，每個案件一個子 span，各階段再往下一層。
+        """
+        trace_id = secrets.token_hex(16)
+        root_id = secrets.token_hex(8)
+        spans = []
+        end_ns = self._wall_ns
+
+        def make_span(span_id, parent_id, name, start_ns, stop_ns, attributes):
+            return {
+                "traceId": trace_id,
+                "spanId": span_id,
+                "parentSpanId": parent_id,
+                "name": name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(stop_ns),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}} for key, value in attributes.items()
+                ],
+            }
+
+        for index in sorted(self.traces):
+            trace = self.traces[index]
+            if trace.start is None and not trace.spans:
+                continue
+            case_id = secrets.token_hex(8)
+            start = trace.start if trace.start is not None else min(s for _, s, _ in trace.spans)
+            case_end_ns = self._unix_ns(trace.finished_at())
+            end_ns = max(end_ns, case_end_ns)
+            spans.append(make_span(
+                case_id, root_id, f"case {trace.case}", self._unix_ns(start), case_end_ns,
+                {"autopunch.case": trace.case, "autopunch.index": trace.index}
+            ))
+            for stage, span_start, span_end in trace.spans:
+                spans.append(make_span(
+                    secrets.token_hex(8), case_id, stage, self._unix_ns(span_start), self._unix_ns(span_end),
+                    {"autopunch.stage": stage}
+                ))
+
+        spans.insert(0, make_span(root_id, "", self.name, self._wall_ns, end_ns, {"autopunch.cases": len(self.traces)}))
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "autopunch"}}]},
+                "scopeSpans": [{"scope": {"name": "autopunch.timing"}, "spans": spans}],
+            }]
+        }
+
+
+def format_totals(totals):
+    """把各階段秒數轉成一行文字，例如「網路 0.12s · HTML 解析 0.03s」"""
+    return " · ".join(
+        f"{STAGE_LABELS[stage]} {totals[stage]:.3f}s" for stage in STAGES if stage in totals
+    )
@@ -0,0 +1,80 @@
+# 冷啟動預熱：程序啟動後在背景載入 HTTP 與 HTML 解析套件、建立共用物件，並記錄首次畫面時間
+#
+# 頁面只匯入輕量的模組就開始排版；requests、bs4 等較重的套件改在背景執行緒載入，
+# 使用者輸入帳密的同時完成，第一次抓取時不必再等待。
+import threading  # 背景執行緒
+import time  # 計時
+from concurrent.futures import Future  # 各預熱工作的結果
+
+_IMPORTED_AT = time.time()  # 無法取得程序啟動時間時，以本模組載入時間代替
+
+# 預熱解析後端用的小頁面
+SAMPLE_CASE_LIST = "<table id='caselist1'><tbody><tr><td></td><td>00000</td></tr></tbody></table>"
+SAMPLE_CASE_EDIT = "<form><input id='f_key' value='1'><textarea id='f_log'>log</textarea></form>"
+
+
+def process_started_at():
+    """目前程序的啟動時間（Unix 秒數）；非 Linux 環境以本模組載入時間代替"""
+    try:
+        import os
+        with open("/proc/self/stat") as f:
+            # 第 22 個欄位為開機後經過的 clock ticks；程序名稱可能含空白，從最後一個 ) 之後算起
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return _IMPORTED_AT
+
+
+def warm_parsing():
+    """載入 HTML 解析後端並解析一小段頁面，讓第一次抓取不必付出載入成本"""
+    from autopunch.parsing import parse_case_list, parse_case_edit_fields, resolve_backend
+    import autopunch.streaming  # noqa: F401  案件編輯頁面的串流讀取
+
+    parse_case_list(SAMPLE_CASE_LIST)
+    parse_case_edit_fields(SAMPLE_CASE_EDIT)
+    return resolve_backend()
+
+
+class Warmup:
+    """
+    在背景執行緒依序執行預熱工作，result(name) 取得結果（尚未完成時等待）
+
+    預熱工作失敗時，result() 拋出原本的例外，呼叫端可改為自行建立。
+    """
+
+    def __init__(self, tasks):
+        self.timings = {}  # {工作名稱: 秒數}
+        self._futures = {name: Future() for name in tasks}
+        self._lock = threading.Lock()
+        self._first_render = None
+        self._thread = threading.Thread(
+            target=self._run, args=(dict(tasks),), name="autopunch-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, tasks):
+        for name, task in tasks.items():
+            started = time.perf_counter()
+            try:
+                self._futures[name].set_result(task())
+            except Exception as e:
+                self._futures[name].set_exception(e)
+            self.timings[name] = time.perf_counter() - started
+
+    def result(self, name, timeout=None):
+        """取得預熱工作的結果"""
+        return self._futures[name].result(timeout)
+
+    @property
+    def done(self):
+        """所有預熱工作是否都已完成"""
+        return all(future.done() for future in self._futures.values())
+
+    def mark_first_render(self):
+        """記錄程序啟動到第一次畫面完成的秒數（只記錄第一次），回傳記錄的值"""
+        with self._lock:
+            if self._first_render is None:
+                self._first_render = time.time() - process_started_at()
+            return self._first_render
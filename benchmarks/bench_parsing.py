@@ -0,0 +1,107 @@
+# HTML 解析微基準：比較各後端解析案件清單與案件編輯頁面的速度
+#
+# 用法：python benchmarks/bench_parsing.py [--cases 200] [--log-lines 3000] [--repeat 20]
+import argparse  # 命令列參數
+import os  # 路徑處理
+import sys  # 模組搜尋路徑
+import timeit  # 計時
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # 原本的完整解析作為基準
+from autopunch.parsing import available_backends, parse_case_list, parse_case_edit, CASE_EDIT_FIELD_IDS
+from autopunch.fields import CASE_EDIT_EXTRACTOR
+
+
+def build_case_list_page(cases):
+    """產生與正式系統相似的案件清單頁面（含導覽列與 caselist1 表格）"""
+    nav = "".join(f"<li><a href='#menu{i}'>選單 {i}</a></li>" for i in range(30))
+    rows = "".join(
+        f"<tr><td><input type='checkbox' name='pick' value='{i}'></td>"
+        f"<td> {i:05d} </td><td>案件名稱 {i}</td><td>2026-01-01</td>"
+        f"<td><a href='#edit{i}'>編輯</a></td></tr>"
+        for i in range(cases)
+    )
+    return (
+        "<html><head><title>案件清單</title>"
+        + "<script>var config = {a: 1};</script>" * 20
+        + f"</head><body><ul class='nav'>{nav}</ul>"
+        + "<table id='caselist1'><thead><tr><th></th><th>案件編號</th><th>名稱</th>"
+        + f"<th>日期</th><th></th></tr></thead><tbody>{rows}</tbody></table></body></html>"
+    )
+
+
+def build_case_edit_page(log_lines):
+    """產生與正式系統相似的案件編輯頁面（f_log 工作日誌佔大部分內容）"""
+    log = "".join(f"2026-01-{i % 28 + 1:02d} 工作紀錄第 {i} 筆 &amp; 後續追蹤\n" for i in range(log_lines))
+    nav = "".join(f"<li><a href='#menu{i}'>選單 {i}</a></li>" for i in range(30))
+    return (
+        "<html><head><title>案件編輯</title>"
+        + "<script>var config = {a: 1};</script>" * 20
+        + f"</head><body><ul class='nav'>{nav}</ul><form id='case_form'>"
+        + "<input id='f_key' value=' 42 '><input id='f_case_name' value='測試案件'>"
+        + "<input id='f_person_id' value='1889'><input id='f_person2_id' value=''>"
+        + "<input id='f_event_date' value='2026-01-01'><input id='f_alert_date' value='2026-02-01'>"
+        + f"<textarea id='f_log'>{log}</textarea><textarea id='f_note'>備註</textarea>"
+        + "<textarea id='f_to_do'>待辦</textarea><input id='f_dir' value='/docs/42'>"
+        + "<input id='f_risk' value='低'><textarea id='f_doc'></textarea></form></body></html>"
+    )
+
+
+def field_values(doc):
+    """以原本逐欄 doc.find 的方式取出欄位值，作為一致性與效能的基準"""
+    values = {}
+    for fid in CASE_EDIT_FIELD_IDS:
+        el = doc.find(id=fid)
+        if el is not None and el.name == "input":
+            values[fid] = el.get("value", "").strip()
+        elif el is not None and el.name == "textarea":
+            values[fid] = el.text.strip()
+        else:
+            values[fid] = ""
+    return values
+
+
+def bench(label, func, repeat, baseline=None):
+    """執行並印出每頁平均時間與相對基準的加速倍數"""
+    per_page = timeit.timeit(func, number=repeat) / repeat
+    speedup = f"{baseline / per_page:5.1f}x" if baseline else "  基準"
+    print(f"  {label:<28} {per_page * 1000:8.2f} ms/頁  {speedup}")
+    return per_page
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 解析後端微基準")
+    parser.add_argument("--cases", type=int, default=200, help="案件清單的案件數")
+    parser.add_argument("--log-lines", type=int, default=3000, help="工作日誌行數")
+    parser.add_argument("--repeat", type=int, default=20, help="每個後端重複次數")
+    args = parser.parse_args()
+
+    list_page = build_case_list_page(args.cases)
+    edit_page = build_case_edit_page(args.log_lines)
+    backends = available_backends()
+    print(f"可用後端：{', '.join(backends)}")
+
+    print(f"\n案件清單（{args.cases} 筆，{len(list_page) / 1024:.0f} KB）")
+    expected = parse_case_list(list_page, "html.parser")
+    baseline = bench("完整 html.parser（原本）", lambda: BeautifulSoup(list_page, "html.parser"), args.repeat)
+    for backend in backends:
+        assert parse_case_list(list_page, backend) == expected, f"{backend} 案件清單結果不一致"
+        bench(backend, lambda: parse_case_list(list_page, backend), args.repeat, baseline)
+
+    print(f"\n案件編輯（{args.log_lines} 行日誌，{len(edit_page) / 1024:.0f} KB）")
+    expected = field_values(BeautifulSoup(edit_page, "html.parser"))
+    baseline = bench("完整 html.parser（原本）", lambda: BeautifulSoup(edit_page, "html.parser"), args.repeat)
+    # 案件編輯頁面一律使用 html.parser（欄位值原樣提交，不能被其他後端改寫）
+    assert field_values(parse_case_edit(edit_page)) == expected, "欄位結果不一致"
+    bench("html.parser + 只保留欄位", lambda: parse_case_edit(edit_page), args.repeat, baseline)
+
+    print("\n欄位擷取（完整解析樹）")
+    doc = BeautifulSoup(edit_page, "html.parser")
+    assert CASE_EDIT_EXTRACTOR.extract(doc) == field_values(doc), "欄位擷取結果不一致"
+    baseline = bench("逐欄 doc.find（原本）", lambda: field_values(doc), args.repeat)
+    bench("單次走訪擷取器", lambda: CASE_EDIT_EXTRACTOR.extract(doc), args.repeat, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# 打卡流程端到端基準：對本機模擬後端執行整批打卡，比較各執行方式的吞吐量、延遲與記憶體
+#
+# 用法：python benchmarks/bench_pipeline.py [--cases 40] [--latency 0.05] [--jitter 0.02] [--error-rate 0]
+#       [--workers 4] [--modes sequential,concurrent,pipeline,async]
+# 每種執行方式都使用全新的模擬後端與客戶端，結果可重現（可用 --seed 固定抖動與錯誤）。
+import argparse  # 命令列參數
+import os  # 路徑處理
+import statistics  # 百分位數
+import sys  # 模組搜尋路徑
+import time  # 計時
+import tracemalloc  # 記憶體用量
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import start_stub_server  # 本機模擬後端
+from autopunch.api import fetch_case_list  # 登入並取得案件清單
+from autopunch.async_api import async_available  # 非同步模式（需安裝 httpx）
+from autopunch.http_client import PunchClient  # 共用連線池客戶端
+from autopunch.resilience import RetryPolicy  # 重試策略
+from autopunch.runner import PunchBatch, is_success, MODE_CONCURRENT, MODE_PIPELINE  # 批次打卡流程
+
+MODES = ("sequential", "concurrent", "pipeline", "async")
+TODAY = "2026-01-31"  # 固定日期，讓每次提交的內容相同
+
+
+def percentile(values, pct):
+    """回傳第 pct 百分位數（資料少於 2 筆時回傳唯一值）"""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def run_mode(mode, base_url, workers, prefetch):
+    """以指定方式跑完一整批，回傳 (耗時秒數, 每案延遲列表, 成功筆數, 總筆數)"""
+    client = PunchClient(base_url, retry_policy=RetryPolicy(base_delay=0.05))
+    case_list = fetch_case_list(client, "1889", "bench")
+    started = {}
+    latencies = []
+
+    def on_result(index, result, done_count):
+        latencies.append(time.perf_counter() - started[index])
+
+    bridge = None
+    if mode == "async":
+        from autopunch.async_api import AsyncBridge, AsyncPunchBatch
+        bridge = AsyncBridge(base_url, retry_policy=client.retry_policy)
+        batch = AsyncPunchBatch(bridge.client, "1889", case_list, "基準測試", TODAY)
+        prepare_async = batch.prepare_async
+
+        async def timed_prepare_async(index):
+            started[index] = time.perf_counter()
+            return await prepare_async(index)
+
+        batch.prepare_async = timed_prepare_async
+    else:
+        batch = PunchBatch(client, "1889", case_list, "基準測試", TODAY)
+        prepare = batch.prepare
+
+        def timed_prepare(index):
+            started[index] = time.perf_counter()
+            return prepare(index)
+
+        batch.prepare = timed_prepare
+
+    begin = time.perf_counter()
+    if mode == "async":
+        results = bridge.run_batch(batch, concurrency=workers, on_result=on_result)
+    elif mode == "pipeline":
+        results = batch.run(mode=MODE_PIPELINE, prefetch=prefetch, on_result=on_result)
+    else:
+        results = batch.run(
+            mode=MODE_CONCURRENT, max_workers=1 if mode == "sequential" else workers, on_result=on_result
+        )
+    elapsed = time.perf_counter() - begin
+
+    if bridge:
+        bridge.close()
+    client.close()
+    return elapsed, latencies, sum(1 for r in results if is_success(r)), len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打卡流程端到端基準")
+    parser.add_argument("--cases", type=int, default=40, help="案件數")
+    parser.add_argument("--log-lines", type=int, default=2000, help="每個案件的工作日誌行數")
+    parser.add_argument("--latency", type=float, default=0.05, help="模擬後端每個請求的延遲秒數")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延遲的隨機抖動秒數（±）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模擬後端回傳 503 的比例")
+    parser.add_argument("--seed", type=int, default=1, help="亂數種子")
+    parser.add_argument("--workers", type=int, default=4, help="並行與非同步模式同時處理的案件數")
+    parser.add_argument("--prefetch", type=int, default=3, help="管線模式預先下載的案件數")
+    parser.add_argument("--modes", default=",".join(MODES), help="要比較的執行方式（逗號分隔）")
+    parser.add_argument("--no-memory", action="store_true", help="略過記憶體量測（量測時會多跑一次）")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if "async" in modes and not async_available():
+        print("未安裝 httpx，略過 async 模式")
+        modes.remove("async")
+
+    stub_options = dict(
+        cases=args.cases, log_lines=args.log_lines, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+    )
+    print(
+        f"{args.cases} 筆案件、延遲 {args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms、"
+        f"錯誤率 {args.error_rate:.0%}、同時處理 {args.workers} 筆"
+    )
+    print(f"\n  {'方式':<12}{'案件/秒':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'成功':>8}{'記憶體峰值':>12}")
+
+    for mode in modes:
+        server, _, base_url = start_stub_server(**stub_options)
+        elapsed, latencies, succeeded, total = run_mode(mode, base_url, args.workers, args.prefetch)
+        server.shutdown()
+
+        peak = ""
+        if not args.no_memory:
+            # tracemalloc 會拖慢執行，因此另外跑一次只量記憶體
+            server, _, base_url = start_stub_server(**stub_options)
+            tracemalloc.start()
+            run_mode(mode, base_url, args.workers, args.prefetch)
+            peak = f"{tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f} MB"
+            tracemalloc.stop()
+            server.shutdown()
+
+        print(
+            f"  {mode:<12}{total / elapsed:>10.1f}"
+            f"{percentile(latencies, 50) * 1000:>8.0f}ms{percentile(latencies, 95) * 1000:>8.0f}ms"
+            f"{percentile(latencies, 99) * 1000:>8.0f}ms{f'{succeeded}/{total}':>8}{peak:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
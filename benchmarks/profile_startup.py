@@ -0,0 +1,93 @@
+# 冷啟動匯入成本分析：以 python -X importtime 量測 streamlit_app.py 頂層匯入的模組，列出最耗時的套件
+#
+# 用法：python benchmarks/profile_startup.py [--top 15] [--repeat 3]
+# 每次都在全新的子程序中量測（沒有已載入的模組），重複數次取最小值以降低雜訊。
+# 另外量測延後載入的 HTTP / HTML 解析套件，對照它們若放回頂層匯入會增加多少啟動時間。
+import argparse  # 命令列參數
+import ast  # 解析 streamlit_app.py 的匯入
+import os  # 路徑處理
+import subprocess  # 全新的子程序
+import sys  # 直譯器路徑
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT, "streamlit_app.py")
+
+# 延後到背景預熱或第一次抓取才載入的模組
+LAZY_MODULES = ["autopunch.http_client", "autopunch.parsing", "autopunch.streaming"]
+
+
+def app_imports(path=APP_FILE):
+    """streamlit_app.py 頂層的 import 敘述（原始碼字串）"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [
+        ast.get_source_segment(source, node)
+        for node in ast.parse(source).body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def measure(statements, baseline=()):
+    """
+    在全新子程序執行匯入，回傳 {模組: (自身微秒, 累計微秒, 深度)} 與頂層累計總和（微秒）
+
+    baseline 中的模組（直譯器啟動時就會載入的 site、encodings 等）不列入。
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if name in baseline:
+            continue
+        modules[name] = (int(self_us), int(cumulative_us), depth)
+        if depth == 0:
+            total += int(cumulative_us)
+    return modules, total
+
+
+def best_of(statements, repeat, baseline=()):
+    """重複量測，取總時間最短的一次"""
+    return min((measure(statements, baseline) for _ in range(max(1, repeat))), key=lambda item: item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷啟動匯入成本分析")
+    parser.add_argument("--top", type=int, default=15, help="列出最耗時的前幾個頂層套件")
+    parser.add_argument("--repeat", type=int, default=3, help="重複量測次數（取最小值）")
+    args = parser.parse_args()
+
+    baseline = set(measure(["pass"])[0])
+    statements = app_imports()
+    modules, total = best_of(statements, args.repeat, baseline)
+    print(f"streamlit_app.py 頂層匯入：{len(statements)} 個敘述，共 {total / 1000:.1f} ms")
+
+    top_level = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth == 0),
+        key=lambda item: item[1], reverse=True
+    )
+    print(f"\n  {'模組':<40}{'累計':>10}{'佔比':>8}")
+    for name, cumulative in top_level[:args.top]:
+        print(f"  {name:<40}{cumulative / 1000:>8.1f}ms{cumulative / total:>8.0%}")
+
+    heavy = [name for name in ("requests", "bs4", "lxml", "selectolax", "httpx") if name in modules]
+    if heavy:
+        print(f"\n⚠️ 頂層匯入仍載入了較重的套件：{', '.join(heavy)}")
+
+    # 延後載入的模組：在已載入 app 頂層匯入的情況下，額外需要多少時間
+    _, lazy_total = best_of(statements + [f"import {name}" for name in LAZY_MODULES], args.repeat, baseline)
+    print(
+        f"\n延後載入（{', '.join(LAZY_MODULES)}）：額外 {(lazy_total - total) / 1000:.1f} ms，"
+        f"由背景預熱或第一次抓取時載入"
+    )
+
+
+if __name__ == "__main__":
+    main()
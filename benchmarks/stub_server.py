@@ -0,0 +1,216 @@
+# 本機模擬後端：提供 case_list / case_edit / sql_for_case，可設定延遲、抖動與錯誤率
+# 頁面附有 ETag，請求帶相同的 If-None-Match 時回 304（模擬條件式請求）
+#
+# 用法：python benchmarks/stub_server.py [--port 8765] [--cases 40] [--latency 0.05] [--jitter 0.02] [--error-rate 0]
+# 之後以 AUTOPUNCH_BASE_URL=http://127.0.0.1:8765 執行 Streamlit 介面或命令列即可，不會連到正式系統。
+import argparse  # 命令列參數
+import hashlib  # ETag
+import html  # HTML 跳脫
+import json  # JSON 處理
+import random  # 延遲抖動與錯誤注入
+import threading  # 狀態鎖與背景執行
+import time  # 模擬延遲
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 標準函式庫 HTTP 伺服器
+from urllib.parse import parse_qs  # 解析表單
+
+# 頁面上與欄位無關的內容（導覽列、腳本），讓頁面大小接近正式系統
+PAGE_HEAD = "<script>var config = {a: 1};</script>" * 20
+PAGE_NAV = "".join(f"<li><a href='#menu{i}'>選單 {i}</a></li>" for i in range(30))
+
+
+class StubBackend:
+    """模擬後端的狀態：每個案件的欄位與工作日誌，提交後會真的寫回日誌"""
+
+    def __init__(self, cases=40, log_lines=2000, latency=0.05, jitter=0.0, error_rate=0.0, seed=None,
+                 set_cookie=False, charset=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.set_cookie = set_cookie  # 登入時以 Set-Cookie 設定 sid=員工編號
+        self.content_type = "text/html; charset=utf-8" if charset else "text/html"  # charset=False 時不標示編碼
+        self.cookies = []  # 每個請求收到的 (路徑, 員工編號, Cookie 標頭)
+        self.lock = threading.Lock()
+        self.counts = {"case_list": 0, "case_edit": 0, "sql_for_case": 0, "errors": 0, "not_modified": 0}
+        log = "".join(f"2026-01-{i % 28 + 1:02d} 工作紀錄第 {i} 筆 & 後續追蹤\n" for i in range(log_lines))
+        self.cases = {
+            f"{i:05d}": {"f_key": str(i + 1), "f_case_name": f"測試案件 {i}", "f_log": log}
+            for i in range(cases)
+        }
+
+    def delay(self):
+        """模擬網路與伺服器處理時間"""
+        with self.lock:
+            seconds = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self):
+        """依錯誤率決定這次請求是否回傳 503"""
+        with self.lock:
+            failed = self.error_rate > 0 and self.random.random() < self.error_rate
+            if failed:
+                self.counts["errors"] += 1
+        return failed
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def record_cookie(self, name, user_id, cookie):
+        with self.lock:
+            self.cookies.append((name, user_id, cookie))
+
+    def case_list_page(self):
+        """案件清單頁面（caselist1 表格，第 2 欄為案件編號）"""
+        rows = "".join(
+            f"<tr><td><input type='checkbox' name='pick' value='{key}'></td>"
+            f"<td> {key} </td><td>{html.escape(case['f_case_name'])}</td><td>2026-01-01</td>"
+            f"<td><a href='#edit{key}'>編輯</a></td></tr>"
+            for key, case in self.cases.items()
+        )
+        return (
+            f"<html><head><title>案件清單</title>{PAGE_HEAD}</head><body><ul class='nav'>{PAGE_NAV}</ul>"
+            "<table id='caselist1'><thead><tr><th></th><th>案件編號</th><th>名稱</th>"
+            f"<th>日期</th><th></th></tr></thead><tbody>{rows}</tbody></table></body></html>"
+        )
+
+    def case_edit_page(self, key):
+        """案件編輯頁面，找不到案件時回傳 None"""
+        with self.lock:
+            case = self.cases.get(key)
+            if case is None:
+                return None
+            case = dict(case)
+        return (
+            f"<html><head><title>案件編輯</title>{PAGE_HEAD}</head><body><ul class='nav'>{PAGE_NAV}</ul>"
+            "<form id='case_form'>"
+            f"<input id='f_key' value=' {case['f_key']} '>"
+            f"<input id='f_case_name' value='{html.escape(case['f_case_name'])}'>"
+            "<input id='f_person_id' value='1889'><input id='f_person2_id' value=''>"
+            "<input id='f_event_date' value='2026-01-01'><input id='f_alert_date' value='2026-02-01'>"
+            f"<textarea id='f_log'>{html.escape(case['f_log'], quote=False)}</textarea>"
+            "<textarea id='f_note'>備註</textarea><textarea id='f_to_do'>待辦</textarea>"
+            "<input id='f_dir' value='/docs'><input id='f_risk' value='低'><textarea id='f_doc'></textarea>"
+            "</form></body></html>"
+        )
+
+    def submit(self, fields):
+        """寫回工作日誌，成功時回傳 True"""
+        with self.lock:
+            for case in self.cases.values():
+                if case["f_key"] == str(fields.get("f_key")):
+                    case["f_log"] = fields.get("f_log", case["f_log"])
+                    return True
+        return False
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+def make_handler(backend):
+    """建立綁定 backend 的請求處理類別"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支援 keep-alive，與正式系統相同
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status, body, content_type=None, etag=None, cookie=None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type or backend.content_type)
+            self.send_header("Content-Length", str(len(data)))
+            if etag:
+                self.send_header("ETag", etag)
+            if cookie:
+                self.send_header("Set-Cookie", cookie)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def reply_page(self, page):
+            """回傳頁面與 ETag；內容未變（If-None-Match 相同）時回 304"""
+            etag = '"' + hashlib.sha1(page.encode("utf-8")).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                backend.count("not_modified")
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.reply(200, page, etag=etag)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/_stats"):
+                self.reply(200, json.dumps(backend.stats()), "application/json")
+            else:
+                self.reply(404, "not found")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            name = self.path.rstrip("/").rsplit("/", 1)[-1]
+            if name not in ("case_list", "case_edit", "sql_for_case"):
+                self.reply(404, "not found")
+                return
+
+            backend.count(name)
+            backend.record_cookie(name, form.get("user_id", [""])[0], self.headers.get("Cookie"))
+            backend.delay()
+            if backend.should_fail():
+                self.reply(503, "service unavailable")
+                return
+
+            if name == "case_list" and backend.set_cookie:
+                self.reply(200, backend.case_list_page(), cookie=f"sid={form.get('user_id', [''])[0]}; Path=/")
+            elif name == "case_list":
+                self.reply_page(backend.case_list_page())
+            elif name == "case_edit":
+                page = backend.case_edit_page(form.get("form_key", [""])[0])
+                if page is None:
+                    self.reply(404, "case not found")
+                else:
+                    self.reply_page(page)
+            elif backend.submit(json.loads(form.get("fields", ["{}"])[0])):
+                self.reply(200, "ok")
+            else:
+                self.reply(400, "unknown case")
+
+    return StubHandler
+
+
+def start_stub_server(port=0, **options):
+    """在背景執行緒啟動模擬後端，回傳 (server, backend, base_url)；port=0 時自動挑選"""
+    backend = StubBackend(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server, backend, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機模擬後端")
+    parser.add_argument("--port", type=int, default=8765, help="監聽的埠號")
+    parser.add_argument("--cases", type=int, default=40, help="案件數")
+    parser.add_argument("--log-lines", type=int, default=2000, help="每個案件的工作日誌行數")
+    parser.add_argument("--latency", type=float, default=0.05, help="每個請求的延遲秒數")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延遲的隨機抖動秒數（±）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳 503 的比例（0~1）")
+    parser.add_argument("--seed", type=int, help="亂數種子，固定後每次結果相同")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(StubBackend(
+        cases=args.cases, log_lines=args.log_lines, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+    )))
+    print(f"模擬後端：http://127.0.0.1:{args.port}（Ctrl+C 結束）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,31 @@
 # 導入所需的函式庫
 import streamlit as st  # Web 應用框架
-import requests  # HTTP 請求
-from bs4 import BeautifulSoup  # HTML 解析
-from datetime import datetime, timezone, timedelta  # 日期時間處理（加入時區支援）
-import time  # 時間控制
-import json  # JSON 處理
+import json  # 匯出計時資料
+import time  # 首次畫面時間
+import uuid  # 執行歷史的 session 編號
+from contextlib import nullcontext  # 不計時時的空範圍
+from autopunch.api import BASE_URL, get_taiwan_date_string, get_taiwan_datetime_string, split_case_list  # 時間與案件清單工具
+from autopunch.resilience import RetryPolicy, CircuitBreaker  # 重試與斷路器
+from autopunch.deadline import DEFAULT_BATCH_DEADLINE, make_deadline  # 批次時限
+from autopunch.timing import BatchTimings, STAGE_RENDER, STAGE_LABELS, format_totals  # 階段計時
+from autopunch.jobs import JobManager, JOB_QUEUED, JOB_FAILED  # 背景批次
+from autopunch.history import RunHistory, HistoryStore  # 精簡的執行歷史
+from autopunch.cache import TTLCache  # 案件欄位快取
+from autopunch.auth import SessionCache  # 登入狀態快取
+from autopunch.punch_index import PunchIndex  # 已打卡索引
+from autopunch.journal import BatchJournal  # 批次執行日誌
+from autopunch.batch import DEFAULT_MAX_WORKERS, DEFAULT_PREFETCH  # 批次引擎預設值
+from autopunch.runner import (  # 批次打卡流程
+    PunchBatch, summarize, is_success, is_skipped, is_deadline_skipped, MODE_CONCURRENT, MODE_PIPELINE
+)
+from autopunch.async_api import async_available  # 非同步模式（需安裝 httpx）
+from autopunch.ratelimit import (  # 自適應速率限制
+    AdaptiveRateLimiter, DEFAULT_RATE, DEFAULT_MAX_RATE, DEFAULT_LATENCY_THRESHOLD
+)
+from autopunch.warmup import Warmup, warm_parsing  # 冷啟動預熱
+# requests、bs4 等較重的套件不在這裡匯入，由背景預熱或第一次抓取時載入
+
+RUN_STARTED = time.perf_counter()  # 本次執行開始的時間，用來計算首次畫面時間
 
 # 頁面設定
 st.set_page_config(
@@ -41,131 +62,296 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# API 基礎網址
-BASE_URL = "https://herbworklog.netlify.app/.netlify/functions"
+# 連線池設定（同一主機最多保留的連線數）
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# 案件編輯頁面欄位快取設定
+CASE_CACHE_MAXSIZE = 500  # 最多保留幾筆案件
+CASE_CACHE_TTL = 60  # 快取 60 秒
 
-# 設定台灣時區
-TAIWAN_TZ = timezone(timedelta(hours=8))  # UTC+8
+# 背景批次進度的更新間隔（秒）
+JOB_POLL_INTERVAL = 1
 
-def get_taiwan_time():
-    """取得台灣當前時間"""
-    return datetime.now(TAIWAN_TZ)
+# 執行歷史每頁顯示幾次
+HISTORY_PAGE_SIZE = 5
 
-def get_taiwan_date_string():
-    """取得台灣當前日期字串 (YYYY-MM-DD)"""
-    return get_taiwan_time().strftime("%Y-%m-%d")
+# 登入狀態保留秒數
+SESSION_TTL = 300
 
-def get_taiwan_datetime_string():
-    """取得台灣當前日期時間字串 (YYYY-MM-DD HH:MM:SS)"""
-    return get_taiwan_time().strftime("%Y-%m-%d %H:%M:%S")
+def make_client():
+    """建立 HTTP 客戶端（keep-alive 連線池與持久化回應快取），requests 在這裡才載入"""
+    from autopunch.http_client import PunchClient
+    from autopunch.response_cache import ResponseCache
+    return PunchClient(
+        BASE_URL, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+        retry_policy=RetryPolicy(), breaker=CircuitBreaker(), response_cache=ResponseCache()
+    )
+
+@st.cache_resource  # 每個程序只預熱一次，第一次執行頁面時在背景開始
+def get_warmup():
+    """取得背景預熱：建立共用客戶端並載入 HTML 解析後端"""
+    return Warmup({"client": make_client, "parsing": warm_parsing})
+
+@st.cache_resource  # 跨 rerun 與 session 共用同一個連線池
+def get_client():
+    """取得共用的 HTTP 客戶端（預熱已完成時直接使用，預熱失敗時自行建立）"""
+    try:
+        return get_warmup().result("client")
+    except Exception:
+        return make_client()
+
+@st.cache_resource  # 所有 session 共用，只存精簡的欄位 dict
+def get_case_cache():
+    """取得案件欄位快取"""
+    return TTLCache(maxsize=CASE_CACHE_MAXSIZE, ttl=CASE_CACHE_TTL)
+
+@st.cache_resource  # 常駐的背景事件迴圈，非同步連線可跨批次重用
+def get_async_bridge():
+    """取得非同步 API 橋接（僅在安裝 httpx 時使用）"""
+    from autopunch.async_api import AsyncBridge
+    client = get_client()  # 與同步客戶端共用重試策略、斷路器與回應快取（同一個後端）
+    return AsyncBridge(
+        BASE_URL, max_connections=POOL_MAXSIZE, retry_policy=client.retry_policy, breaker=client.breaker,
+        response_cache=client.response_cache
+    )
+
+@st.cache_resource  # 所有 session 共用同一個 SQLite 連線
+def get_punch_index():
+    """取得已打卡索引"""
+    return PunchIndex()
+
+@st.cache_resource  # 所有 session 共用，瀏覽器關閉後仍保留進度
+def get_batch_journal():
+    """取得批次執行日誌"""
+    return BatchJournal()
+
+@st.cache_resource  # 所有 session 共用，各 session 以編號區分
+def get_history_store():
+    """取得執行歷史的本機存放區（記憶體中放不下的較舊紀錄）"""
+    return HistoryStore()
+
+@st.cache_resource  # 所有 session 共用，批次在背景執行緒執行，重新整理頁面也不會中斷
+def get_job_manager():
+    """取得背景批次管理器"""
+    return JobManager()
+
+@st.cache_resource  # 所有 session 與分頁共用，快取鍵為加鹽雜湊，不保存密碼明文
+def get_session_cache():
+    """取得登入狀態快取"""
+    return SessionCache(ttl=SESSION_TTL)
 
 # 工具函數
-@st.cache_data(ttl=300)  # 快取 5 分鐘，避免重複請求
 def fetch_case_list(user_id, password):
-    """根據使用者帳密自動取得案件清單"""
-    try:
-        data = {
-            "user_id": user_id,
-            "f_password": password,
-            "f_password2": "",
-            "from_case_edit": ""
-        }
-        resp = requests.post(f"{BASE_URL}/case_list", data=data, timeout=30)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # 找到案件清單表格
-        table = soup.find("table", {"id": "caselist1"})
-        if not table:
-            return None
-
-        # 找到表格中的所有行
-        rows = table.find("tbody").find_all("tr") if table.find("tbody") else table.find_all("tr")
-
-        # 提取每行第2個td的內容（案件編號）
-        case_numbers = []
-        for row in rows:
-            tds = row.find_all("td")
-            if len(tds) >= 2:  # 確保至少有2個td
-                case_number = tds[1].get_text(strip=True)  # 第2個td（索引1）
-                if case_number:
-                    case_numbers.append(case_number)
-
-        # 用逗號串接所有案件編號
-        return ",".join(case_numbers) if case_numbers else None
-
-    except Exception as e:
-        return None
-
-@st.cache_data(ttl=60)  # 快取 60 秒，避免重複請求
-def fetch_case_edit(case_key, case_list, user_id):
-    """取得案件編輯頁面"""
+    """
+    根據使用者帳密自動取得案件清單，回傳 (登入狀態或 None, 是否重用登入狀態, 背景更新的 Future 或 None)
+
+    登入狀態已過期時先回傳上次的案件清單，同時在背景重新登入
+    """
+    return get_session_cache().login_stale_while_revalidate(get_client(), user_id, password)
+
+def session_authorized(user_id):
+    """本 session 是否已以正確帳密抓取過這位員工的案件清單（才能替這位員工打卡或繼續批次）"""
+    return bool(user_id) and st.session_state.get("authorized_user") == user_id
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_case_list_refresh():
+    """等待背景更新的案件清單，完成後記下差異並重新整理頁面"""
+    refresh, served_case_list = st.session_state.case_list_refresh
+    if not refresh.done():
+        st.caption("🔄 正在背景更新案件清單...")
+        return
+
+    st.session_state.case_list_refresh = None
     try:
-        data = {
-            "form_key": case_key,
-            "table_case_id_list": case_list,
-            "user_id": user_id
-        }
-        resp = requests.post(f"{BASE_URL}/case_edit", data=data, timeout=30)
-        resp.raise_for_status()
-        return BeautifulSoup(resp.text, "html.parser")
-    except Exception as e:
-        return None
-
-def extract_fields(doc, today, user_id, punch_message):
-    """從案件編輯頁面提取欄位資料"""
-    field_ids = [
-        "f_key", "f_case_name", "f_person_id", "f_person2_id",
-        "f_event_date", "f_alert_date", "f_log", "f_note",
-        "f_to_do", "f_dir", "f_risk", "f_doc"
-    ]
-
-    payload = {}
-    for fid in field_ids:
-        el = doc.find(id=fid)
-        if not el:
-            payload[fid] = ""
-        elif el.name == "input":
-            payload[fid] = el.get("value", "").strip()
-        elif el.name == "textarea":
-            payload[fid] = el.text.strip()
+        changes = refresh.result()
+    except Exception:
+        changes = {"case_list": None, "added": [], "removed": []}
+    # 使用者在更新期間清除或重新抓取過清單時，不覆蓋目前的清單
+    if st.session_state.get("auto_case_list") == served_case_list:
+        if changes["case_list"]:
+            st.session_state.auto_case_list = changes["case_list"]
         else:
-            payload[fid] = ""
+            # 重新登入失敗（可能已改密碼）：需要重新抓取才能再替這位員工打卡
+            st.session_state.authorized_user = None
+    st.session_state.case_list_changes = changes
+    st.rerun()
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_job_progress(job_id):
+    """背景批次的即時進度（只有這個區塊會定期重新執行，頁面其他部分仍可操作）"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    snapshot = job.snapshot(results=False)
+    if job.finished:
+        st.rerun()  # 整頁重新執行，改為顯示最終結果
+
+    # 每個案件完成後第一次顯示它時，把畫面更新時間記到該案件（之後的輪詢不重複記錄）
+    last, last_index = snapshot["last"], snapshot["last_index"]
+    render = nullcontext()
+    if last is not None and st.session_state.get("rendered_case") != (job.job_id, last_index):
+        st.session_state.rendered_case = (job.job_id, last_index)
+        render = job.meta["timings"].span(last_index, last["case"], STAGE_RENDER)
+
+    with render:
+        done, total = snapshot["done"], snapshot["total"]
+        st.progress(done / total if total else 1.0)
+        if snapshot["state"] == JOB_QUEUED:
+            st.info("⏳ 批次排隊中，其他批次完成後會自動開始...")
+        elif last is None:
+            st.info(job.meta["start_message"])
+        elif is_success(last):
+            st.success(f"✅ 案件 {last['case']} 打卡成功！({done}/{total})")
+        elif is_deadline_skipped(last):
+            st.warning(f"⌛ 案件 {last['case']} 超過批次時限，未處理 ({done}/{total})")
+        elif is_skipped(last):
+            st.info(f"⏭️ 案件 {last['case']} 今日已打卡，略過 ({done}/{total})")
+        else:
+            st.error(f"❌ 案件 {last['case']} 打卡失敗！({done}/{total})")
+
+        # 進行中只顯示各狀態的案件數與最近完成的幾個案件，每次輪詢送出的內容不隨批次大小增加；
+        # 完整結果在批次結束後由 show_job_result() 顯示一次
+        if snapshot["status_counts"]:
+            st.caption("　".join(f"{status} {count}" for status, count in snapshot["status_counts"].items()))
+        if snapshot["recent"]:
+            st.subheader("📊 最近完成的案件")
+            rows = [
+                {"案件": r["case"], "狀態": r["status"], "說明": r["message"]}
+                for r in reversed(snapshot["recent"])
+            ]
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        st.caption("💡 批次在背景執行，可以繼續操作頁面或重新整理，不會中斷")
+
+def show_job_result(job, auto_save_log):
+    """背景批次結束後的最終結果、統計與詳細資料"""
+    snapshot = job.snapshot()
+    results = snapshot["results"]
+    total = snapshot["total"]
+    run_id = job.meta["run_id"]
+    limiter = job.meta["limiter"]
+    timings = job.meta["timings"]
+
+    if snapshot["state"] == JOB_FAILED:
+        st.error(f"❌ **批次執行時發生錯誤：** {snapshot['error']}")
+        st.warning("💡 已完成的案件都已記錄，可以按「⏯️ 繼續上次未完成的批次」處理剩下的案件")
+        return
+
+    st.subheader("📊 執行結果")
+    for r in results:
+        if is_success(r):
+            st.success(f"**{r['case']}** - {r['status']} - {r['message']}")
+        elif is_skipped(r):
+            st.info(f"**{r['case']}** - {r['status']} - {r['message']}")
+        elif is_deadline_skipped(r):
+            st.warning(f"**{r['case']}** - {r['status']} - {r['message']}")
+        else:
+            st.error(f"**{r['case']}** - {r['status']} - {r['message']}")
+
+    # 最終結果統計
+    summary = summarize(results)
+    success_count = summary["success_count"]
+    skipped_count = summary["skipped_count"]
+    deadline_count = summary["deadline_count"]
+
+    if deadline_count:
+        st.warning(
+            f"⌛ **批次時限已到！** 已完成 {success_count}/{total} 筆打卡，"
+            f"{deadline_count} 筆案件未處理，可稍後按「⏯️ 繼續上次未完成的批次」處理"
+        )
+    elif skipped_count == total:
+        st.success(f"🎉 **今天都已打卡！** {skipped_count} 筆案件皆已略過，沒有重複提交")
+    elif success_count + skipped_count == total:
+        st.success(f"🎉 **全部成功！** 已完成 {success_count}/{total} 筆打卡，略過 {skipped_count} 筆今日已打卡案件")
+    elif success_count > 0:
+        st.warning(f"⚠️ **部分成功！** 已完成 {success_count}/{total} 筆打卡")
+    else:
+        st.error(f"❌ **全部失敗！** 無法完成任何打卡")
+
+    # 連線重用統計
+    conn_stats = get_client().stats()
+    st.caption(
+        f"🔌 連線統計（伺服器累計）：{conn_stats['requests']} 次請求、新建 {conn_stats['connections']} 條連線、"
+        f"重用率 {conn_stats['reuse_ratio']:.0%}、平均延遲 {conn_stats['avg_latency']:.2f} 秒、"
+        f"重試 {conn_stats['retries']} 次"
+    )
+    if conn_stats['circuit'] != "closed":
+        st.caption("⛔ 伺服器連續失敗，已暫停送出請求一段時間後再自動試探")
+    cache_stats = get_case_cache().stats()
+    st.caption(
+        f"🗃️ 案件快取：{cache_stats['size']} 筆、命中 {cache_stats['hits']} 次、"
+        f"未命中 {cache_stats['misses']} 次、淘汰 {cache_stats['evictions']} 次"
+    )
+    if get_client().response_cache is not None:
+        response_stats = get_client().response_cache.stats()
+        st.caption(
+            f"💾 回應快取（本機）：{response_stats['entries']} 筆、{response_stats['bytes'] / 1024:.0f} KB、"
+            f"內容未變（304）沿用 {response_stats['hits']} 次、重新下載 {response_stats['misses']} 次"
+        )
+    if limiter:
+        rate_stats = limiter.stats()
+        st.caption(
+            f"🚦 速率限制：結束時 {rate_stats['rate']:.1f} 次/秒、"
+            f"正常回應 {rate_stats['healthy']} 次、降速回應 {rate_stats['throttled']} 次"
+        )
 
-    # 轉換 f_key 為整數
-    payload["f_key"] = int(payload["f_key"])
+    # 詳細結果表格
+    st.subheader("📋 詳細執行結果")
+    stage_stats = timings.stats()
+    if stage_stats:
+        st.caption("⏱️ 各階段耗時（合計 / 平均 / p95）：" + "、".join(
+            f"{STAGE_LABELS[stage]} {s['total']:.2f}s / {s['mean'] * 1000:.0f}ms / {s['p95'] * 1000:.0f}ms"
+            for stage, s in stage_stats.items()
+        ))
+    for i, result in enumerate(results, 1):
+        with st.expander(f"{i}. 案件 {result['case']} - {result['status']}"):
+            st.write(f"**案件編號：** {result['case']}")
+            st.write(f"**執行狀態：** {result['status']}")
+            st.write(f"**案件資訊：** {result['message']}")
+            st.write(f"**詳細說明：** {result.get('details', '無')}")
+            stage_totals = timings.case_totals(i - 1)
+            if stage_totals:
+                st.write(f"**階段耗時：** {format_totals(stage_totals)}")
+
+    # 匯出計時資料，方便比較不同版本的效能
+    export_col1, export_col2 = st.columns(2)
+    with export_col1:
+        st.download_button(
+            "⬇️ 下載計時資料（JSON）",
+            data=timings.to_json(),
+            file_name=f"punch_timings_{run_id}.json",
+            mime="application/json"
+        )
+    with export_col2:
+        st.download_button(
+            "⬇️ 下載 OpenTelemetry 追蹤",
+            data=json.dumps(timings.to_otel()),
+            file_name=f"punch_trace_{run_id}.otlp.json",
+            mime="application/json"
+        )
 
-    # 更新工作日誌
-    original_log = payload.get("f_log", "")
-    payload["f_log"] = f"{punch_message}\n\n{original_log}".strip()
+    # 儲存到執行歷史（每個批次只儲存一次，重新整理不會重複）
+    if auto_save_log and job.job_id not in st.session_state.saved_jobs:
+        st.session_state.saved_jobs.add(job.job_id)
+        timestamp = get_taiwan_datetime_string()  # 使用台灣時間
+        st.session_state.punch_log.append(timestamp, results, "正常模式")
+        st.info("💾 執行結果已儲存到歷史記錄")
 
-    # 設定更新資訊
-    payload["f_update_date"] = today
-    payload["f_last_editor"] = user_id
+    # 重新執行建議
+    if summary["failed_count"]:
+        st.warning("💡 **建議：** 如果有失敗的案件，可以檢查錯誤原因後重新執行（已成功的案件會自動略過）")
 
-    return payload
+    st.success("🏁 **執行完成！** 您可以關閉此頁面或繼續使用其他功能")
 
-def submit_punch(payload):
-    """提交打卡資料"""
-    try:
-        # 將 payload 轉換為 JSON 字串，放在 fields 欄位中
-        json_payload = json.dumps(payload)
-        form_data = {"fields": json_payload}
-
-        resp = requests.post(
-            f"{BASE_URL}/sql_for_case",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            data=form_data,
-            timeout=30
-        )
-        resp.raise_for_status()
-        return resp.text
-    except Exception as e:
-        return None
+# 背景預熱：第一次執行時開始載入 HTTP 與 HTML 解析套件，與使用者輸入帳密同時進行
+warmup = get_warmup()
 
 # 初始化 session state
-if 'punch_log' not in st.session_state:
-    st.session_state.punch_log = []
+if not isinstance(st.session_state.get('punch_log'), RunHistory):
+    # 記憶體中只保留最近幾次，較舊的移到本機存放區
+    st.session_state.punch_log = RunHistory(uuid.uuid4().hex, store=get_history_store())
+if 'saved_jobs' not in st.session_state:
+    st.session_state.saved_jobs = set()  # 已存入歷史記錄的背景批次
 
 # 主要介面
 col1, col2 = st.columns([2, 1])
@@ -212,15 +398,25 @@ with col1:
             st.error("❌ 請先填寫登入密碼")
         else:
             with st.spinner("🔍 正在從系統取得您的案件清單..."):
-                auto_case_list = fetch_case_list(user_id, password)
+                auth_session, reused_login, refresh = fetch_case_list(user_id, password)
+                auto_case_list = auth_session.case_list if auth_session else None
+                st.session_state.case_list_refresh = (refresh, auto_case_list) if refresh else None
+                st.session_state.case_list_changes = None
+                st.session_state.authorized_user = user_id if auto_case_list else None
 
                 if auto_case_list:
                     # 自動填入案件清單
                     st.session_state.auto_case_list = auto_case_list
                     # 解析案件數量
-                    auto_cases = [k.strip() for k in auto_case_list.split(",") if k.strip()]
+                    auto_cases = split_case_list(auto_case_list)
 
                     st.success(f"✅ 成功抓取！從表格中找到 {len(auto_cases)} 個案件")
+                    if refresh:
+                        st.caption(
+                            f"🔑 先顯示 {auth_session.age / 60:.0f} 分鐘前的案件清單，正在背景重新登入確認是否有變動"
+                        )
+                    elif reused_login:
+                        st.caption("🔑 沿用先前的登入狀態，未重新送出帳密")
                 else:
                     st.error("❌ 無法取得案件清單")
 
@@ -237,13 +433,30 @@ with col1:
                         st.write("- 先嘗試手動登入系統確認帳密")
                         st.write("- 如果問題持續，請聯繫系統管理員")
 
+    # 背景更新案件清單的進度與結果
+    if st.session_state.get("case_list_refresh"):
+        show_case_list_refresh()
+    changes = st.session_state.get("case_list_changes")
+    if changes:
+        if changes["case_list"] is None:
+            st.warning("⚠️ 背景更新案件清單失敗，請重新抓取以確認帳密是否正確")
+        elif changes["added"] or changes["removed"]:
+            lines = []
+            if changes["added"]:
+                lines.append(f"🆕 新增 {len(changes['added'])} 個案件：{', '.join(changes['added'])}")
+            if changes["removed"]:
+                lines.append(f"➖ 移除 {len(changes['removed'])} 個案件：{', '.join(changes['removed'])}")
+            st.info("📋 案件清單已更新\n\n" + "\n\n".join(lines))
+        else:
+            st.caption("✅ 已在背景確認，案件清單沒有變動")
+
     st.divider()
 
     # 顯示已抓取的案件清單（只讀）
     if st.session_state.get('auto_case_list'):
         st.markdown("### 📋 目前的案件清單")
         case_list = st.session_state.auto_case_list
-        case_keys = [k.strip() for k in case_list.split(",") if k.strip()]
+        case_keys = split_case_list(case_list)
 
         # 使用只讀的文字區域顯示
         st.text_area(
@@ -261,6 +474,7 @@ with col1:
         with col_clear:
             if st.button("🗑️ 清除", help="清除已抓取的案件清單，重新抓取"):
                 st.session_state.auto_case_list = ""
+                st.session_state.case_list_changes = None
                 st.rerun()
 
     else:
@@ -270,6 +484,78 @@ with col1:
     # 選項設定
     st.subheader("⚙️ 執行設定")
 
+    batch_modes = ["並行處理", "管線處理"]
+    if async_available():
+        batch_modes.append("非同步處理")
+    batch_mode = st.radio(
+        "🔀 執行方式",
+        batch_modes,
+        horizontal=True,
+        help="並行處理：同時處理多個案件；管線處理：一次只提交一筆，但提交時先下載下一筆案件；"
+             "非同步處理：以單一事件迴圈同時處理多個案件（需安裝 httpx）"
+    )
+
+    max_workers = DEFAULT_MAX_WORKERS
+    prefetch = DEFAULT_PREFETCH
+    if batch_mode in ("並行處理", "非同步處理"):
+        max_workers = st.number_input(
+            "🧵 同時處理案件數",
+            min_value=1,
+            max_value=10,
+            value=DEFAULT_MAX_WORKERS,
+            help="同時處理的案件數量，數字越大越快，但對伺服器負擔也越大"
+        )
+    else:
+        prefetch = st.number_input(
+            "📥 預先下載案件數",
+            min_value=1,
+            max_value=20,
+            value=DEFAULT_PREFETCH,
+            help="提交目前案件時，最多預先下載並解析幾筆後續案件"
+        )
+
+    batch_deadline = st.number_input(
+        "⌛ 批次時限（秒）",
+        min_value=0,
+        max_value=3600,
+        value=DEFAULT_BATCH_DEADLINE,
+        step=30,
+        help="整批最多執行多久；時限到時尚未處理的案件不會送出，需按「⏯️ 繼續上次未完成的批次」處理。0 表示不限制"
+    )
+
+    use_rate_limit = st.checkbox(
+        "🚦 自適應速率限制",
+        value=True,
+        help="依伺服器回應速度與錯誤（429、5xx）自動調整請求速率"
+    )
+    if use_rate_limit:
+        with st.expander("🚦 速率限制設定"):
+            initial_rate = st.number_input(
+                "起始速率（每秒請求數）", min_value=0.2, max_value=50.0,
+                value=DEFAULT_RATE, step=0.5
+            )
+            max_rate = st.number_input(
+                "最高速率（每秒請求數）", min_value=0.2, max_value=50.0,
+                value=DEFAULT_MAX_RATE, step=0.5
+            )
+            latency_threshold = st.number_input(
+                "回應過慢門檻（秒）", min_value=0.5, max_value=30.0,
+                value=DEFAULT_LATENCY_THRESHOLD, step=0.5,
+                help="回應時間超過此門檻時自動降速"
+            )
+
+    skip_punched = st.checkbox(
+        "⏭️ 略過今日已打卡的案件",
+        value=True,
+        help="今天已用相同訊息打卡成功的案件，重新執行時不再連線提交"
+    )
+    verify_punched = st.checkbox(
+        "🔍 略過前先核對工作日誌",
+        value=False,
+        disabled=not skip_punched,
+        help="重新下載已打卡案件，確認工作日誌最上方確實是這則訊息才略過"
+    )
+
     auto_save_log = st.checkbox(
         "📝 自動儲存日誌",
         value=True,
@@ -282,12 +568,15 @@ with col2:
 
     # 驗證輸入
     case_list = st.session_state.get('auto_case_list', '')
-    input_valid = bool(user_id and password and case_list)
+    authorized = session_authorized(user_id)
+    input_valid = bool(user_id and password and case_list and authorized)
 
     if not user_id or not password:
         st.warning("⚠️ 請填寫員工編號和密碼")
     elif not case_list:
         st.warning("⚠️ 請使用「🔄 抓取案件清單」取得案件清單")
+    elif not authorized:
+        st.warning("⚠️ 目前的案件清單不是這位員工的，請重新「🔄 抓取案件清單」")
     else:
         st.success("✅ 所有資訊已準備就緒，可以開始操作")
 
@@ -299,151 +588,182 @@ with col2:
         key="punch_message_input_right"
     )
 
+    today = get_taiwan_date_string()  # 使用台灣時間
+    journal = get_batch_journal()
+    job_manager = get_job_manager()
+
+    # 這位員工在背景執行中的批次（可能是其他分頁或重新整理前啟動的）；
+    # 只有本 session 啟動的或已通過帳密驗證時才接上進度，避免只憑員工編號看到他人的案件
+    active_job = job_manager.active_job(user_id) if user_id else None
+    if active_job and st.session_state.get("active_job_id") != active_job.job_id and authorized:
+        st.session_state.active_job_id = active_job.job_id
+
     # 開始打卡按鈕
-    if st.button(
+    start_clicked = st.button(
         "🚀 開始打卡",
-        disabled=not input_valid,
+        disabled=not input_valid or active_job is not None,
         use_container_width=True,
         type="primary"
-    ):
-        # 確認執行
-        st.info(f"🎯 執行模式：正常模式（處理所有案件）")
-
-        # 解析案件清單
-        case_keys = [k.strip() for k in case_list.split(",") if k.strip()]
-        today = get_taiwan_date_string()  # 使用台灣時間
-
-        st.info(f"📋 將處理 {len(case_keys)} 筆案件")
-
-        # 建立結果顯示區域
-        progress_bar = st.progress(0)
-        status_placeholder = st.empty()
-        results_placeholder = st.empty()
-
-        # 執行結果列表
-        results = []
-
-        # 開始處理每個案件
-        for i, key in enumerate(case_keys):
-            # 更新進度
-            progress = (i + 1) / len(case_keys)
-            progress_bar.progress(progress)
-            status_placeholder.info(f"⚙️ 處理案件 {key} ({i+1}/{len(case_keys)})...")
-
-            try:
-                # 取得案件資料
-                with st.spinner(f"📡 正在取得案件 {key} 的資料..."):
-                    doc = fetch_case_edit(key, case_list, user_id)
-
-                if not doc:
-                    results.append({
-                        "case": key,
-                        "status": "❌ 失敗",
-                        "message": "無法取得案件資料",
-                        "details": "請檢查案件編號是否正確"
-                    })
-                    continue
-
-                # 提取欄位資料
-                payload = extract_fields(doc, today, user_id, punch_message)
-                case_name = payload.get('f_case_name', '未知')
-                f_key = payload.get('f_key', '未知')
-
-                # 顯示案件資訊
-                status_placeholder.success(f"📋 找到案件：{case_name} (ID: {f_key})")
-
-                # 提交打卡資料
-                with st.spinner("💾 正在提交打卡資料..."):
-                    result = submit_punch(payload)
-
-                if result:
-                    results.append({
-                        "case": key,
-                        "status": "✅ 成功",
-                        "message": f"案件：{case_name}",
-                        "details": f"f_key: {f_key}，已更新工作日誌",
-                        "f_key": f_key
-                    })
-                    status_placeholder.success(f"✅ 案件 {key} 打卡成功！")
-                else:
-                    results.append({
-                        "case": key,
-                        "status": "❌ 失敗",
-                        "message": f"案件：{case_name}",
-                        "details": "提交打卡資料失敗"
-                    })
-                    status_placeholder.error(f"❌ 案件 {key} 打卡失敗！")
-
-                # 即時顯示目前結果
-                with results_placeholder.container():
-                    st.subheader("📊 執行結果")
-                    for r in results:
-                        if r["status"].startswith("✅"):
-                            st.success(f"**{r['case']}** - {r['status']} - {r['message']}")
-                        else:
-                            st.error(f"**{r['case']}** - {r['status']} - {r['message']}")
-
-                # 暫停避免請求過快
-                time.sleep(1)
-
-            except Exception as e:
-                error_msg = str(e)
-                results.append({
-                    "case": key,
-                    "status": "❌ 錯誤",
-                    "message": "系統錯誤",
-                    "details": error_msg
-                })
-                status_placeholder.error(f"❌ 處理案件 {key} 時發生錯誤：{error_msg}")
-
-        # 最終結果統計
-        progress_bar.progress(1.0)
-        success_count = sum(1 for r in results if r["status"].startswith("✅"))
-
-        # 顯示最終結果
-        status_placeholder.empty()  # 清除狀態訊息
-
-        if success_count == len(case_keys):
-            st.success(f"🎉 **全部成功！** 已完成 {success_count}/{len(case_keys)} 筆打卡")
-        elif success_count > 0:
-            st.warning(f"⚠️ **部分成功！** 已完成 {success_count}/{len(case_keys)} 筆打卡")
-        else:
-            st.error(f"❌ **全部失敗！** 無法完成任何打卡")
-
-        # 詳細結果表格
-        st.subheader("📋 詳細執行結果")
-        for i, result in enumerate(results, 1):
-            with st.expander(f"{i}. 案件 {result['case']} - {result['status']}"):
-                st.write(f"**案件編號：** {result['case']}")
-                st.write(f"**執行狀態：** {result['status']}")
-                st.write(f"**案件資訊：** {result['message']}")
-                st.write(f"**詳細說明：** {result.get('details', '無')}")
+    )
 
-        # 儲存到執行歷史
-        if auto_save_log:
-            timestamp = get_taiwan_datetime_string()  # 使用台灣時間
-            st.session_state.punch_log.append({
-                "timestamp": timestamp,
-                "results": results,
-                "success_count": success_count,
-                "total_count": len(case_keys),
-                "mode": "正常模式"
-            })
-            st.info("💾 執行結果已儲存到歷史記錄")
+    # 上次中斷的批次（同一位員工、同一天），可只處理未完成的案件；需先通過帳密驗證
+    unfinished_run = journal.last_unfinished_run(user_id, today) if authorized and not active_job else None
+    if unfinished_run and not unfinished_run["pending"]:
+        journal.finish_run(unfinished_run["run_id"])
+        unfinished_run = None
+
+    resume_clicked = False
+    if unfinished_run:
+        resume_clicked = st.button(
+            f"⏯️ 繼續上次未完成的批次（剩 {len(unfinished_run['pending'])} 筆）",
+            help=f"上次批次開始於 {unfinished_run['created_at']}，只會處理尚未完成的案件",
+            use_container_width=True
+        )
 
-        # 重新執行建議
-        if success_count < len(case_keys):
-            st.warning("💡 **建議：** 如果有失敗的案件，可以檢查錯誤原因後重新執行")
+    if start_clicked or resume_clicked:
+        if resume_clicked:
+            # 沿用上次批次的案件清單、訊息與已完成的結果
+            run_id = unfinished_run["run_id"]
+            case_keys = unfinished_run["case_keys"]
+            case_list = unfinished_run["case_list"]
+            punch_message = unfinished_run["punch_message"]
+            finished = unfinished_run["results"]
+            st.info(f"⏯️ 繼續上次的批次：共 {len(case_keys)} 筆，剩 {len(unfinished_run['pending'])} 筆未完成")
+        else:
+            # 確認執行
+            st.info(f"🎯 執行模式：正常模式（處理所有案件）")
+
+            # 解析案件清單
+            case_keys = split_case_list(case_list)
+            st.info(f"📋 將處理 {len(case_keys)} 筆案件")
+
+            # 建立批次日誌，逐筆記錄進度
+            journal.prune(today)
+            run_id = journal.start_run(user_id, case_keys, case_list, punch_message, today)
+            finished = [None] * len(case_keys)
+
+        # 尚未完成的案件索引
+        pending = [i for i, r in enumerate(finished) if r is None]
+
+        # 每次批次建立新的速率限制器
+        limiter = None
+        if use_rate_limit:
+            limiter = AdaptiveRateLimiter(
+                rate=initial_rate,
+                max_rate=max_rate,
+                latency_threshold=latency_threshold
+            )
+
+        # 已打卡索引：今天以相同訊息打卡成功的案件
+        punch_index = None
+        if skip_punched:
+            punch_index = get_punch_index()
+            punch_index.prune(today)
+
+        # 每個案件各階段的耗時
+        timings = BatchTimings(name=f"punch_batch {user_id}")
+
+        bridge = None
+        if batch_mode == "非同步處理":
+            from autopunch.async_api import AsyncPunchBatch
+            bridge = get_async_bridge()
+            batch_client, batch_class = bridge.client, AsyncPunchBatch
+        else:
+            batch_client, batch_class = get_client(), PunchBatch
 
-        st.success("🏁 **執行完成！** 您可以關閉此頁面或繼續使用其他功能")
+        batch = batch_class(
+            batch_client, user_id, case_list, punch_message, today,
+            case_keys=case_keys, cache=get_case_cache(), limiter=limiter,
+            punch_index=punch_index, verify_punched=verify_punched,
+            timings=timings
+        )
+        if batch.already_punched:
+            st.info(f"⏭️ 有 {len(batch.already_punched)} 筆案件今天已打卡，將略過")
 
+        if batch_mode == "非同步處理":
+            start_message = f"⚙️ 以非同步方式同時處理 {max_workers} 筆，共 {len(pending)} 筆案件..."
+        elif batch_mode == "並行處理":
+            start_message = f"⚙️ 以 {max_workers} 個並行工作處理 {len(pending)} 筆案件..."
+        else:
+            start_message = f"⚙️ 以管線方式處理 {len(pending)} 筆案件（預先下載 {prefetch} 筆）..."
+
+        def run_job(job, batch=batch, bridge=bridge, mode=batch_mode, run_id=run_id, pending=pending,
+                    max_workers=max_workers, prefetch=prefetch, deadline_seconds=batch_deadline):
+            """在背景執行緒處理所有未完成案件（不可呼叫任何 st.* 函式）"""
+            # 時限從真正開始執行時起算，排隊的時間不計入
+            batch.deadline = make_deadline(deadline_seconds)
+
+            def on_case_done(index, result, done_count):
+                if not is_deadline_skipped(result):
+                    # 因時限未處理的案件不寫入日誌，之後可以繼續
+                    journal.record_result(run_id, index, result)
+                job.record(index, result)
+
+            if bridge:
+                bridge.run_batch(batch, pending, concurrency=max_workers, on_result=on_case_done)
+            else:
+                batch.run(
+                    pending,
+                    mode=MODE_CONCURRENT if mode == "並行處理" else MODE_PIPELINE,
+                    max_workers=max_workers,
+                    prefetch=prefetch,
+                    on_result=on_case_done
+                )
+
+            # 所有案件都已處理，批次結束（有案件因時限未處理時保留日誌，可稍後繼續）
+            if not any(is_deadline_skipped(r) for r in job.snapshot()["results"]):
+                journal.finish_run(run_id)
+
+        job = job_manager.submit(
+            user_id, len(case_keys), run_job, finished=finished,
+            run_id=run_id, limiter=limiter, timings=timings, start_message=start_message
+        )
+        st.session_state.active_job_id = job.job_id
 
+    # 顯示背景批次：執行中時只有進度區塊會定期更新，結束後顯示最終結果
+    job = job_manager.get(st.session_state.get("active_job_id"))
+    if job is not None:
+        if job.finished:
+            show_job_result(job, auto_save_log)
+        else:
+            show_job_progress(job.job_id)
+
+
+# 執行歷史（分頁讀取，較舊的紀錄從本機存放區讀回）
+history = st.session_state.punch_log
+if history:
+    history_total = len(history)
+    with st.expander(f"📈 執行歷史（共 {history_total} 次）"):
+        page_count = (history_total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = 1
+        if page_count > 1:
+            page = st.number_input("頁次", min_value=1, max_value=page_count, value=1, key="history_page")
+        for record in history.page(page - 1, HISTORY_PAGE_SIZE):
+            st.markdown(
+                f"**{record.timestamp}**：{record.success_count}/{record.total_count} 筆成功，"
+                f"略過 {record.skipped_count} 筆"
+                + (f"，{record.deadline_count} 筆超過批次時限未處理" if record.deadline_count else "")
+            )
+            for case, label, failure in record.rows():
+                if failure:
+                    st.caption(f"{case} - {label} - {failure}")
+        if st.button("🗑️ 清除歷史記錄", key="clear_history"):
+            history.clear()
+            st.rerun()
+
+# 首次畫面時間：本 session 第一次執行的排版時間，以及程序啟動到第一個畫面的時間（冷啟動）
+if "first_render" not in st.session_state:
+    st.session_state.first_render = time.perf_counter() - RUN_STARTED
+cold_start = warmup.mark_first_render()
 
 # 頁腳資訊
 st.divider()
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; color: #666; font-size: 0.9em;">
-    🤖 自動打卡系統 v3.0 - 簡潔版
+    🤖 自動打卡系統 v3.0 - 簡潔版<br>
+    <span style="font-size: 0.85em;">
+        ⏱️ 首次畫面 {st.session_state.first_render * 1000:.0f} ms · 程序啟動至首次畫面 {cold_start:.1f} 秒
+    </span>
 </div>
 """, unsafe_allow_html=True)
 
@@ -0,0 +1,37 @@
+# 批次時限：剩餘時間截斷連線 / 讀取逾時，寫入請求的讀取逾時不截斷
+import unittest
+from unittest.mock import patch
+
+from autopunch.deadline import Deadline, DeadlineExceeded, make_deadline
+
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch("autopunch.deadline.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeout_clipped_to_remaining(self):
+        deadline = Deadline(10)
+        self.now += 8
+        self.assertEqual(deadline.timeout(5, 30), (2, 2))
+
+    def test_write_keeps_read_timeout(self):
+        deadline = Deadline(10)
+        self.now += 8
+        self.assertEqual(deadline.timeout(5, 30, clip_read=False), (2, 30))
+
+    def test_expired_refuses_to_start(self):
+        deadline = Deadline(10)
+        self.now += 10
+        self.assertRaises(DeadlineExceeded, deadline.check)
+        self.assertRaises(DeadlineExceeded, deadline.timeout, 5, 30, clip_read=False)
+
+    def test_make_deadline_zero_is_unlimited(self):
+        self.assertIsNone(make_deadline(0))
+        self.assertIsNone(make_deadline(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# 共用連線不保存 cookie：一位員工登入時後端設定的 cookie 不會被帶到其他員工的請求上
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from stub_server import start_stub_server  # 本機模擬後端
+from autopunch import api, async_api
+from autopunch.async_api import AsyncBridge
+from autopunch.http_client import PunchClient
+
+
+class TestSharedClientCookies(unittest.TestCase):
+    def backend(self):
+        server, backend, url = start_stub_server(cases=2, log_lines=1, latency=0, set_cookie=True)
+        self.addCleanup(server.shutdown)
+        return backend, url
+
+    def assert_no_cookies(self, backend):
+        self.assertEqual([entry for entry in backend.cookies if entry[2] is not None], [])
+        self.assertEqual({entry[1] for entry in backend.cookies if entry[0] == "case_list"}, {"alice", "bob"})
+
+    def test_sync_users_do_not_share_cookies(self):
+        backend, url = self.backend()
+        client = PunchClient(url)
+        self.addCleanup(client.close)
+        for user_id in ("alice", "bob", "alice"):
+            self.assertEqual(api.fetch_case_list(client, user_id, "pw"), "00000,00001")
+            api.fetch_case_edit(client, "00000", "00000,00001", user_id)
+        self.assertEqual(len(client.session.cookies), 0)
+        self.assert_no_cookies(backend)
+
+    def test_async_users_do_not_share_cookies(self):
+        backend, url = self.backend()
+        bridge = AsyncBridge(url)
+        self.addCleanup(bridge.close)
+        for user_id in ("alice", "bob", "alice"):
+            self.assertEqual(bridge.call(async_api.fetch_case_list(bridge.client, user_id, "pw")), "00000,00001")
+            bridge.call(async_api.fetch_case_edit(bridge.client, "00000", "00000,00001", user_id))
+        self.assertEqual(len(bridge.client.client.cookies), 0)
+        self.assert_no_cookies(backend)
+
+    def test_explicit_cookies_are_sent_but_not_kept(self):
+        backend, url = self.backend()
+        client = PunchClient(url)
+        self.addCleanup(client.close)
+        bridge = AsyncBridge(url)
+        self.addCleanup(bridge.close)
+        form = api.case_edit_form("00000", "00000,00001", "bob")
+        client.post("case_edit", data=form, cookies={"sid": "bob"}).close()
+        bridge.call(bridge.client.post("case_edit", data=form, cookies={"sid": "bob"}))
+        client.post("case_edit", data=form).close()
+        bridge.call(bridge.client.post("case_edit", data=form))
+        self.assertEqual([entry[2] for entry in backend.cookies], ["sid=bob", "sid=bob", None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
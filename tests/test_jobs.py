@@ -0,0 +1,33 @@
+# 背景批次工作：進行中的快照只含各狀態案件數與最近完成的案件，不複製完整結果
+import unittest
+
+from autopunch.jobs import DEFAULT_RECENT_RESULTS, Job
+
+
+def result(index, status="✅ 成功"):
+    return {"case": f"{index:05d}", "status": status, "message": ""}
+
+
+class TestJobSnapshot(unittest.TestCase):
+    def test_running_snapshot_is_bounded(self):
+        job = Job("job-1", "1889", 30)
+        for index in range(25):
+            job.record(index, result(index, "❌ 失敗" if index % 5 == 0 else "✅ 成功"))
+        snapshot = job.snapshot(results=False)
+        self.assertNotIn("results", snapshot)
+        self.assertEqual(len(snapshot["recent"]), DEFAULT_RECENT_RESULTS)
+        self.assertEqual(snapshot["recent"][-1]["case"], "00024")
+        self.assertEqual(snapshot["status_counts"], {"❌ 失敗": 5, "✅ 成功": 20})
+        self.assertEqual(len(job.snapshot()["results"]), 30)
+
+    def test_counts_include_resumed_and_replaced_results(self):
+        job = Job("job-1", "1889", 3, finished=[result(0, "⏭️ 略過"), None, None])
+        job.record(1, result(1, "❌ 失敗"))
+        job.record(1, result(1))
+        snapshot = job.snapshot(results=False)
+        self.assertEqual(snapshot["done"], 2)
+        self.assertEqual(snapshot["status_counts"], {"⏭️ 略過": 1, "✅ 成功": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+# 案件編輯頁面的欄位值會原樣提交回去，不論安裝了哪個解析後端都要與原本的 html.parser 完全相同
+import unittest
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+
+from autopunch.parsing import BACKEND_ENV, available_backends, parse_case_edit_fields
+from autopunch.streaming import CaseEditStream
+
+# 換行、沒有分號的字元參照與 NUL：lxml / selectolax 會改寫這些內容
+FIXTURE = (
+    "<html><body><form><input id='f_key' value='12'>"
+    "<input id='f_case_name' value='AT&T&reg2\r\n案件'>"
+    "<textarea id='f_log'>第一行\r\n第二行\r第三行 AT&T&reg2 &notit; &amp; &#169;\x00結尾\r\n</textarea>"
+    "<textarea id='f_note'>a&copyb\r\n</textarea><textarea id='f_doc'></textarea>"
+    "</form></body></html>"
+)
+
+
+def baseline_fields(html):
+    """原本的做法：完整 html.parser 解析後逐欄 find"""
+    doc = BeautifulSoup(html, "html.parser")
+    return {
+        "f_log": doc.find(id="f_log").text.strip(),
+        "f_note": doc.find(id="f_note").text.strip(),
+        "f_case_name": doc.find(id="f_case_name").get("value", "").strip(),
+    }
+
+
+class TestCaseEditMatchesBaseline(unittest.TestCase):
+    def assert_baseline(self, fields):
+        expected = baseline_fields(FIXTURE)
+        self.assertEqual({fid: fields[fid] for fid in expected}, expected)
+        self.assertIn("\r\n", fields["f_log"])
+        self.assertIn("\x00", fields["f_log"])
+
+    def test_every_backend_setting(self):
+        for backend in available_backends():
+            with self.subTest(backend), patch.dict("os.environ", {BACKEND_ENV: backend}):
+                self.assert_baseline(parse_case_edit_fields(FIXTURE))
+
+    def test_streaming(self):
+        stream = CaseEditStream("utf-8", field_ids=["f_key", "f_case_name", "f_log", "f_note", "f_doc"], max_bytes=0)
+        data = FIXTURE.encode("utf-8")
+        for i in range(0, len(data), 7):
+            if stream.feed(data[i:i + 7]):
+                break
+        stream.finish()
+        self.assertTrue(stream.complete)
+        self.assert_baseline(parse_case_edit_fields(stream.text()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+# CircuitBreaker 狀態機：關閉 → 開啟 → 半開試探 → 關閉 / 重新開啟，以及試探名額的歸還與逾時
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from autopunch.deadline import Deadline, DeadlineExceeded
+from autopunch.resilience import (
+    CircuitBreaker, CircuitOpenError, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+)
+
+
+class FakeClock:
+    """可手動前進的 time.monotonic()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch("autopunch.resilience.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_breaker(self, **kwargs):
+        """建立斷路器並連續失敗到開啟"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, **kwargs)
+        for _ in range(2):
+            self.assertIsNone(breaker.before_request())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        return breaker
+
+    def test_closed_counts_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertIsNone(breaker.before_request())
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_CLOSED)  # 成功後重新計算
+
+    def test_open_rejects_until_reset_timeout(self):
+        breaker = self.open_breaker()
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        self.clock.now += 9.9
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        self.clock.now += 0.1
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = self.open_breaker()
+        self.clock.now += 10
+        self.assertIsNotNone(breaker.before_request())
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+
+    def test_probe_success_closes(self):
+        breaker = self.open_breaker()
+        self.clock.now += 10
+        breaker.before_request()
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertIsNone(breaker.before_request())
+
+    def test_probe_failure_reopens(self):
+        breaker = self.open_breaker()
+        self.clock.now += 10
+        breaker.before_request()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        self.clock.now += 10
+        self.assertIsNotNone(breaker.before_request())
+
+    def test_release_probe_allows_next_probe(self):
+        breaker = self.open_breaker()
+        self.clock.now += 10
+        probe = breaker.before_request()
+        breaker.release_probe(probe)
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)  # 歸還名額不改變狀態
+        self.assertIsNotNone(breaker.before_request())
+
+    def test_release_none_is_noop(self):
+        breaker = self.open_breaker()
+        self.clock.now += 10
+        breaker.before_request()
+        breaker.release_probe(None)
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+
+    def test_unreported_probe_expires(self):
+        breaker = self.open_breaker(probe_timeout=30)
+        self.clock.now += 10
+        breaker.before_request()
+        self.clock.now += 29
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        self.clock.now += 1
+        self.assertIsNotNone(breaker.before_request())
+
+    def test_stale_probe_cannot_release_new_probe(self):
+        breaker = self.open_breaker(probe_timeout=5)
+        self.clock.now += 10
+        old = breaker.before_request()
+        self.clock.now += 5
+        new = breaker.before_request()  # 舊試探逾時作廢
+        self.assertNotEqual(old, new)
+        breaker.release_probe(old)
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        breaker.release_probe(new)
+        self.assertIsNotNone(breaker.before_request())
+
+
+class TestClientProbeRelease(unittest.TestCase):
+    """請求沒有得到後端結果就結束時，PunchClient 要歸還試探名額"""
+
+    def setUp(self):
+        from autopunch.http_client import PunchClient
+
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        self.breaker.record_failure()  # 冷卻為 0：下一個請求就是試探
+        self.client = PunchClient("http://127.0.0.1:9", breaker=self.breaker)
+        self.addCleanup(self.client.close)
+
+    def test_expired_deadline_does_not_take_probe(self):
+        deadline = Deadline(0)
+        self.assertRaises(DeadlineExceeded, self.client.post, "case_list", deadline=deadline)
+        self.assertIsNotNone(self.breaker.before_request())
+
+    def test_deadline_during_send_releases_probe(self):
+        def send(*args, **kwargs):
+            raise DeadlineExceeded("已超過批次時限")
+
+        with patch.object(self.client, "_send", send):
+            self.assertRaises(DeadlineExceeded, self.client.post, "case_list")
+        self.assertIsNotNone(self.breaker.before_request())
+
+    def test_write_read_timeout_not_clipped(self):
+        sent = {}
+
+        def post(url, timeout=None, **kwargs):
+            sent["timeout"] = timeout
+            raise requests.ConnectionError("refused")
+
+        deadline = Deadline(60)
+        with patch.object(self.client.session, "post", post):
+            self.assertRaises(requests.ConnectionError, self.client.post, "sql_for_case",
+                              timeout=(5, 120), idempotent=False, deadline=deadline)
+        self.assertEqual(sent["timeout"][1], 120)
+        with patch.object(self.client.session, "post", post):
+            self.assertRaises(requests.ConnectionError, self.client.post, "case_edit",
+                              timeout=(5, 120), deadline=deadline)
+        self.assertLessEqual(sent["timeout"][1], 60)
+
+    def test_cancelled_async_probe_is_released(self):
+        import asyncio
+        from autopunch.async_api import AsyncPunchClient
+
+        async def run():
+            client = AsyncPunchClient("http://127.0.0.1:9", breaker=self.breaker)
+
+            async def send(*args, **kwargs):
+                await asyncio.sleep(10)
+
+            try:
+                with patch.object(client, "_send", send):
+                    task = asyncio.ensure_future(client.post("case_list"))
+                    await asyncio.sleep(0)
+                    task.cancel()
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+            finally:
+                await client.aclose()
+
+        asyncio.run(run())
+        self.assertIsNotNone(self.breaker.before_request())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# 持久化回應快取：304 沿用解析結果；條件式請求被拒（412 等）時移除項目並改送一般請求
+import asyncio
+import os
+import tempfile
+import unittest
+
+import httpx
+import requests
+
+from autopunch import api, async_api
+from autopunch.response_cache import ResponseCache
+
+CASE_LIST_PAGE = "<table id='caselist1'><tbody><tr><td></td><td>{}</td></tr></tbody></table>"
+CASE_EDIT_PAGE = "<form><input id='f_key' value='{}'><textarea id='f_log'>log</textarea></form>"
+
+
+def sync_response(status, body="", headers=None):
+    """不經網路建立的 requests 回應"""
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp._content = body.encode("utf-8")
+    resp._content_consumed = True
+    resp.encoding = "utf-8"
+    resp.url = "http://stub/"
+    resp.reason = "stub"
+    return resp
+
+
+def async_response(status, body="", headers=None):
+    """不經網路建立的 httpx 回應"""
+    return httpx.Response(status, content=body.encode("utf-8"), headers=headers,
+                          request=httpx.Request("POST", "http://stub/"))
+
+
+class ScriptedClient:
+    """依序回傳預先安排的回應，並記錄每次請求的標頭"""
+
+    base_url = "http://stub"
+
+    def __init__(self, cache, replies, make=sync_response):
+        self.response_cache = cache
+        self.replies = list(replies)
+        self.sent = []
+        self.make = make
+
+    def post(self, path, headers=None, **kwargs):
+        self.sent.append(headers or {})
+        return self.make(*self.replies.pop(0))
+
+
+class AsyncScriptedClient(ScriptedClient):
+    async def post(self, path, headers=None, **kwargs):
+        return ScriptedClient.post(self, path, headers, **kwargs)
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = ResponseCache(os.path.join(tmp.name, "http_cache.sqlite3"))
+        self.addCleanup(self.cache._conn.close)
+
+    def prime_case_list(self, etag='"v1"'):
+        client = ScriptedClient(self.cache, [(200, CASE_LIST_PAGE.format("00001"), {"ETag": etag})])
+        self.assertEqual(api.fetch_case_list(client, "1889", "pw"), "00001")
+        return self.cache.key(client.base_url, "case_list", "1889")
+
+    def test_not_modified_reuses_parsed_value(self):
+        self.prime_case_list()
+        client = ScriptedClient(self.cache, [(304,)])
+        self.assertEqual(api.fetch_case_list(client, "1889", "pw"), "00001")
+        self.assertEqual(client.sent[0].get("If-None-Match"), '"v1"')
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_precondition_failed_retries_without_conditions(self):
+        key = self.prime_case_list()
+        client = ScriptedClient(self.cache, [
+            (412,), (200, CASE_LIST_PAGE.format("00002"), {"ETag": '"v2"'})
+        ])
+        self.assertEqual(api.fetch_case_list(client, "1889", "pw"), "00002")
+        self.assertIn("If-None-Match", client.sent[0])
+        self.assertEqual(client.sent[1], {})
+        self.assertEqual(self.cache.lookup(key).etag, '"v2"')
+
+    def test_rejected_entry_is_invalidated_even_if_retry_fails(self):
+        key = self.prime_case_list()
+        client = ScriptedClient(self.cache, [(412,), (500,)])
+        self.assertIsNone(api.fetch_case_list(client, "1889", "pw"))
+        self.assertIsNone(self.cache.lookup(key))
+        # 下一次不再送出條件式標頭
+        client = ScriptedClient(self.cache, [(200, CASE_LIST_PAGE.format("00003"), {"ETag": '"v3"'})])
+        self.assertEqual(api.fetch_case_list(client, "1889", "pw"), "00003")
+        self.assertEqual(client.sent, [{}])
+
+    def test_unconditional_error_is_not_retried(self):
+        client = ScriptedClient(self.cache, [(500,)])
+        self.assertIsNone(api.fetch_case_list(client, "1889", "pw"))
+        self.assertEqual(len(client.sent), 1)
+
+    def test_case_edit_precondition_failed(self):
+        def fetch(client):
+            return api.fetch_case_edit(client, "00001", "00001", "1889")
+
+        fields = fetch(ScriptedClient(self.cache, [(200, CASE_EDIT_PAGE.format(1), {"ETag": '"e1"'})]))
+        self.assertEqual(fields["f_key"], "1")
+        client = ScriptedClient(self.cache, [(412,), (200, CASE_EDIT_PAGE.format(2), {"ETag": '"e2"'})])
+        self.assertEqual(fetch(client)["f_key"], "2")
+        self.assertEqual(client.sent[1], {})
+
+    def test_async_precondition_failed(self):
+        self.prime_case_list()
+        client = AsyncScriptedClient(self.cache, [
+            (412,), (200, CASE_LIST_PAGE.format("00004"), {"ETag": '"v4"'})
+        ], make=async_response)
+        self.assertEqual(asyncio.run(async_api.fetch_case_list(client, "1889", "pw")), "00004")
+        self.assertEqual(client.sent[1], {})
+
+        client = AsyncScriptedClient(self.cache, [
+            (200, CASE_EDIT_PAGE.format(1), {"ETag": '"e1"'}), (412,),
+            (200, CASE_EDIT_PAGE.format(5), {"ETag": '"e5"'})
+        ], make=async_response)
+        fetch = async_api.fetch_case_edit(client, "00001", "00001", "1889")
+        self.assertEqual(asyncio.run(fetch)["f_key"], "1")
+        fetch = async_api.fetch_case_edit(client, "00001", "00001", "1889")
+        self.assertEqual(asyncio.run(fetch)["f_key"], "5")
+        self.assertIn("If-None-Match", client.sent[1])
+        self.assertEqual(client.sent[2], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
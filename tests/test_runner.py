@@ -0,0 +1,120 @@
+# 批次流程：同步與非同步版本共用判斷邏輯，對同一個模擬後端應得到相同的結果
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from stub_server import start_stub_server  # 本機模擬後端
+from autopunch.async_api import AsyncBridge, AsyncPunchBatch
+from autopunch.deadline import Deadline
+from autopunch.http_client import PunchClient
+from autopunch.punch_index import PunchIndex
+from autopunch.runner import MODE_PIPELINE, PunchBatch, summarize
+
+TODAY = "2026-01-15"
+MESSAGE = "今日訪視完成"
+
+
+class TestBatchParity(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def backend(self, **options):
+        server, backend, url = start_stub_server(cases=4, log_lines=3, latency=0, **options)
+        self.addCleanup(server.shutdown)
+        return backend, url
+
+    def run_sync(self, url, mode=None, **kwargs):
+        client = PunchClient(url)
+        self.addCleanup(client.close)
+        batch = PunchBatch(client, "1889", "00000,00001,00002,00003,99999", MESSAGE, TODAY, **kwargs)
+        return batch.run(mode=mode) if mode else batch.run()
+
+    def run_async(self, url, **kwargs):
+        bridge = AsyncBridge(url)
+        self.addCleanup(bridge.close)
+        batch = AsyncPunchBatch(bridge.client, "1889", "00000,00001,00002,00003,99999", MESSAGE, TODAY, **kwargs)
+        return bridge.run_batch(batch)
+
+    def punch_index(self, name, punched):
+        """已打卡索引：punched 中的案件記為今天已打卡"""
+        index = PunchIndex(os.path.join(self.tmp, name))
+        for key in punched:
+            index.record("1889", key, TODAY, MESSAGE)
+        return index
+
+    def test_same_results(self):
+        runs = [
+            self.run_sync(self.backend()[1]),
+            self.run_sync(self.backend()[1], mode=MODE_PIPELINE),
+            self.run_async(self.backend()[1]),
+        ]
+        for results in runs:
+            self.assertEqual(results, runs[0])
+        self.assertEqual(summarize(runs[0])["success_count"], 4)
+        self.assertEqual(runs[0][4]["message"], "無法取得案件資料")
+
+    def test_verify_punched(self):
+        runs = []
+        for name, run in (("sync.sqlite3", self.run_sync), ("async.sqlite3", self.run_async)):
+            backend, url = self.backend()
+            # 00000 確實已打卡；00001 只在索引中，工作日誌沒有這則訊息
+            backend.submit({"f_key": "1", "f_log": f"{MESSAGE}\n\n舊紀錄"})
+            index = self.punch_index(name, ["00000", "00001"])
+            results = run(url, punch_index=index, verify_punched=True)
+            self.assertEqual(index.punched_cases("1889", TODAY, MESSAGE), {"00000", "00001", "00002", "00003"})
+            runs.append(results)
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0][0]["details"], "已核對工作日誌，略過此案件")
+        self.assertTrue(runs[0][1]["status"].startswith("✅"))
+
+    def test_skip_without_verify(self):
+        runs = [
+            self.run_sync(self.backend()[1], punch_index=self.punch_index("sync.sqlite3", ["00002"])),
+            self.run_async(self.backend()[1], punch_index=self.punch_index("async.sqlite3", ["00002"])),
+        ]
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(summarize(runs[0])["skipped_count"], 1)
+
+    def test_index_error_during_verify(self):
+        # 核對後移除索引紀錄失敗時回報系統錯誤，而不是留下 None
+        runs = []
+        for name, run in (("sync.sqlite3", self.run_sync), ("async.sqlite3", self.run_async)):
+            index = self.punch_index(name, ["00001"])
+
+            def forget(*args):
+                raise sqlite3.OperationalError("database is locked")
+
+            index.forget = forget
+            runs.append(run(self.backend()[1], punch_index=index, verify_punched=True))
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0][1]["message"], "系統錯誤")
+        self.assertEqual(summarize(runs[0])["failed_count"], 2)
+
+    def test_expired_deadline(self):
+        runs = [
+            self.run_sync(self.backend()[1], deadline=Deadline(0)),
+            self.run_async(self.backend()[1], deadline=Deadline(0)),
+        ]
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(summarize(runs[0])["deadline_count"], 5)
+
+    def test_response_without_charset(self):
+        # 沒有標示 charset 的 text/html：兩個版本都依 requests 的規則以 ISO-8859-1 解碼
+        backends, runs = [], []
+        for run in (self.run_sync, self.run_async):
+            backend, url = self.backend(charset=False)
+            runs.append(run(url))
+            backends.append(backend)
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0][0]["message"], "案件：" + "測試案件 0".encode("utf-8").decode("iso-8859-1"))
+        self.assertEqual(backends[0].cases, backends[1].cases)
+
+
+if __name__ == "__main__":
+    unittest.main()
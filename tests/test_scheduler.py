@@ -0,0 +1,43 @@
+# 多人排程：批次時限到時不再登入其餘員工
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from stub_server import start_stub_server  # 本機模擬後端
+from autopunch.deadline import Deadline
+from autopunch.http_client import PunchClient
+from autopunch.scheduler import STATE_DEADLINE, STATE_DONE, RosterEntry, Scheduler
+
+TODAY = "2026-01-15"
+
+
+class TestSchedulerDeadline(unittest.TestCase):
+    def setUp(self):
+        server, self.backend, url = start_stub_server(cases=3, log_lines=1, latency=0)
+        self.addCleanup(server.shutdown)
+        self.client = PunchClient(url)
+        self.addCleanup(self.client.close)
+
+    def test_expired_deadline_skips_login(self):
+        roster = [
+            RosterEntry("1889", "訊息", password="pw"),
+            RosterEntry("1890", "訊息", password="pw"),
+            RosterEntry("1891", "訊息", case_list="00000,00001"),
+        ]
+        progress = Scheduler(self.client, TODAY, deadline=Deadline(0)).run(roster)
+        self.assertEqual(self.backend.stats()["case_list"], 0)
+        self.assertEqual([progress[u].state for u in ("1889", "1890")], [STATE_DEADLINE, STATE_DEADLINE])
+        # 已指定案件清單的員工不必登入，案件標為超過批次時限
+        self.assertEqual(progress["1891"].state, STATE_DONE)
+        self.assertEqual(progress["1891"].as_dict()["deadline_count"], 2)
+        self.assertEqual(sum(self.backend.stats().values()), 0)
+
+    def test_without_deadline(self):
+        progress = Scheduler(self.client, TODAY).run([RosterEntry("1889", "訊息", password="pw")])
+        self.assertEqual(progress["1889"].as_dict()["success_count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# 串流讀取案件編輯頁面：不論在哪裡切段，結果都要與讀完整頁後解析的結果相同
+import unittest
+
+from autopunch.parsing import parse_case_edit_fields
+from autopunch.streaming import MAX_TAG_CHARS, CaseEditStream
+
+FIELDS = (
+    "<input id='f_case_name' value='案件'><input id='f_person_id' value='1889'>"
+    "<input id='f_person2_id' value=''><input id='f_event_date' value='2026-01-01'>"
+    "<input id='f_alert_date' value='2026-02-01'><textarea id='f_note'>備註</textarea>"
+    "<textarea id='f_to_do'>待辦</textarea><input id='f_dir' value='/docs'><input id='f_risk' value='低'>"
+)
+TRAILER = "<div id='f_key'>頁尾重複的 ID 不算數</div><p>" + "x" * 200 + "</p></body></html>"
+
+PAGES = {
+    "標籤與註解": (
+        "<html><body><!-- <input id='f_key' value='註解中的欄位'> -->"
+        "<form><input id=\"f_key\" value=\" 42 \">" + FIELDS +
+        "<textarea id='f_log'>第一行\n<input id='f_doc' value='日誌中的文字'>\n第二行</textarea>"
+        "<textarea id='f_doc'>文件</textarea></form>" + TRAILER
+    ),
+    "未加引號與自我結束": (
+        "<form><input id=f_key value=7 /><input id=f_doc value=d/>" + FIELDS +
+        "<textarea id=f_log>日誌</textarea></form>" + TRAILER
+    ),
+    "屬性值含 id=": (
+        "<form><input title=\"說明 id=f_log 與 id='f_doc'\" data-x=' id=f_key' id='f_key' value='9'>"
+        "<input class=\"a\" placeholder='x id=f_doc>' id=\"f_doc\" value=\"doc\">" + FIELDS +
+        "<textarea id='f_log'>日誌</textarea></form>" + TRAILER
+    ),
+    "原始文字元素": (
+        "<html><head><title><input id='f_key' value='標題'></title>"
+        "<script>if (a < b) { s = \"<input id='f_log'>\"; }</script>"
+        "<style>p > a { color: red }</style></head><body><form>"
+        "<input id='f_key' value='1'>" + FIELDS + "<textarea id='f_log'>a </textarea b> </TEXTAREA >"
+        "<textarea id='f_doc'></textarea></form>" + TRAILER
+    ),
+}
+
+
+def streamed(html, chunks):
+    """依切段位置逐段餵入，回傳 (串流解析結果, 是否提早停止)"""
+    data = html.encode("utf-8")
+    stream = CaseEditStream("utf-8", max_bytes=0)
+    bounds = [0] + list(chunks) + [len(data)]
+    for start, end in zip(bounds, bounds[1:]):
+        if stream.feed(data[start:end]):
+            break
+    stream.finish()
+    return parse_case_edit_fields(stream.text()), stream.complete
+
+
+class TestCaseEditStream(unittest.TestCase):
+    def assert_matches_full_parse(self, html):
+        expected = parse_case_edit_fields(html)
+        size = len(html.encode("utf-8"))
+        # 一次讀完、每個位元組一段、以及每一個位置切成兩段
+        splits = [[], list(range(1, size))] + [[i] for i in range(1, size)]
+        for chunks in splits:
+            fields, complete = streamed(html, chunks)
+            self.assertEqual(fields, expected, f"切段位置 {chunks[:3]}...")
+            self.assertTrue(complete)
+
+    def test_pages_match_full_parse(self):
+        for name, html in PAGES.items():
+            with self.subTest(name):
+                self.assert_matches_full_parse(html)
+
+    def test_stops_before_trailer(self):
+        stream = CaseEditStream("utf-8", max_bytes=0)
+        html = PAGES["標籤與註解"]
+        self.assertTrue(stream.feed(html.encode("utf-8")))
+        self.assertNotIn("頁尾", stream.text())
+        self.assertTrue(stream.text().endswith("</textarea>"))
+
+    def test_textarea_end_split_across_chunks(self):
+        html = PAGES["標籤與註解"]
+        data = html.encode("utf-8")
+        cut = data.index(b"</textarea>", data.index(b"f_log")) + len(b"</texta")
+        fields, complete = streamed(html, [cut])
+        self.assertTrue(complete)
+        self.assertEqual(fields, parse_case_edit_fields(html))
+
+    def test_missing_field_reads_whole_page(self):
+        html = PAGES["標籤與註解"].replace("id='f_doc'>文件", "id='f_other'>文件")
+        fields, complete = streamed(html, [10, 100])
+        self.assertFalse(complete)
+        self.assertEqual(fields, parse_case_edit_fields(html))
+
+    def test_unfinished_tag_is_linear(self):
+        # 很長、還沒結束的開始標籤不能讓標籤比對回溯爆炸
+        stream = CaseEditStream("utf-8", max_bytes=0)
+        for _ in range(50):
+            self.assertFalse(stream.feed(b"<input " + b"a" * 1000))
+        html = PAGES["標籤與註解"]
+        self.assertTrue(stream.feed(b">" + html.encode("utf-8")))
+        self.assertEqual(parse_case_edit_fields(stream.text()), parse_case_edit_fields(html))
+
+    def test_unclosed_quote_reads_whole_page(self):
+        # 屬性值少了結尾引號時放棄提早停止，仍與整頁解析相同
+        html = "<form><input title=\"x id='f_key'>" + "y" * (MAX_TAG_CHARS + 10) + PAGES["標籤與註解"]
+        fields, complete = streamed(html, range(4096, len(html), 4096))
+        self.assertFalse(complete)
+        self.assertEqual(fields, parse_case_edit_fields(html))
+
+
+if __name__ == "__main__":
+    unittest.main()